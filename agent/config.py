@@ -0,0 +1,41 @@
+# Configuration constants for the agent loop
+MODEL_NAME = "gemini-2.0-flash-001"
+MAX_ITERATIONS = 20
+MAX_PARALLEL_TOOL_CALLS = 8
+
+# Hardcoded working directory for security
+WORKING_DIRECTORY = "./calculator"
+
+# Upper bound on model requests in flight at once across all concurrent sessions
+MAX_IN_FLIGHT_REQUESTS = 32
+
+# Estimated prompt size above which old turns are summarized
+HISTORY_TOKEN_BUDGET = 32000
+
+# Number of most recent model turns that are never summarized
+KEEP_RECENT_TURNS = 4
+
+# Lifetime of the explicit context cache, extended while the session is active
+CONTEXT_CACHE_TTL_SECONDS = 3600
+
+# Smallest prefix, in tokens, the API accepts for an explicit context cache, by model family;
+# a smaller prefix is sent inline without trying
+MIN_CACHED_TOKENS = {"gemini-2.5-flash": 1024, "gemini-2.5-pro": 4096}
+DEFAULT_MIN_CACHED_TOKENS = 4096
+
+# Models tried in order when the requested one is rate limited or unavailable
+FALLBACK_MODELS = ("gemini-2.0-flash-lite-001",)
+
+# Request quota shared by every session in the process; the defaults are the
+# free tier's limits for gemini-2.0-flash, raise them for a paid key
+REQUESTS_PER_MINUTE = 15
+TOKENS_PER_MINUTE = 1000000
+
+# Retries per model for rate limits and transient errors, with jittered exponential backoff
+MAX_REQUEST_RETRIES = 4
+RETRY_BASE_DELAY_SECONDS = 1.0
+RETRY_MAX_DELAY_SECONDS = 60.0
+
+# Files read ahead into a session's cache after each turn, while the model works on the next
+PREFETCH_MAX_FILES = 8
+PREFETCH_WORKERS = 2
@@ -0,0 +1,179 @@
+import time
+from google.genai import types
+from functions.paths import resolve_path
+from .config import (
+    CONTEXT_CACHE_TTL_SECONDS,
+    DEFAULT_MIN_CACHED_TOKENS,
+    MIN_CACHED_TOKENS,
+    MODEL_NAME,
+    WORKING_DIRECTORY,
+)
+from .history import CHARS_PER_TOKEN
+from .tools import system_prompt, get_available_functions
+
+# Extend the cache this long before it would expire
+TTL_REFRESH_MARGIN_SECONDS = 60
+
+
+def min_cached_tokens(model):
+    """Return the smallest prefix, in tokens, the API will cache for model."""
+    for family, minimum in MIN_CACHED_TOKENS.items():
+        if model.startswith(family):
+            return minimum
+    return DEFAULT_MIN_CACHED_TOKENS
+
+
+def estimate_prefix_tokens(system_instruction=system_prompt):
+    """Estimate the size of the system instruction and tool declarations sent with every request."""
+    declarations = get_available_functions().model_dump_json(exclude_none=True)
+    return (len(system_instruction) + len(declarations)) // CHARS_PER_TOKEN
+
+
+def pinned_instruction(pinned_files, working_directory=WORKING_DIRECTORY):
+    """
+    Build the system instruction with the content of stable files appended.
+
+    Pinning large files that do not change during a session, e.g. a spec
+    or a big module the model will keep reading, saves resending them in
+    tool results and can bring the prefix up to the cacheable size.
+
+    Args:
+        pinned_files: Paths relative to working_directory
+        working_directory: The base directory that limits file access
+
+    Returns:
+        The system instruction text
+
+    Raises:
+        ValueError: A path is outside the working directory
+        OSError: A file cannot be read
+    """
+    if not pinned_files:
+        return system_prompt
+    sections = [system_prompt, "The following files are pinned for this session, as they were when it started:"]
+    for file_path in pinned_files:
+        abs_path = resolve_path(working_directory, file_path)
+        if abs_path is None:
+            raise ValueError(f'Cannot pin "{file_path}" as it is outside the permitted working directory')
+        with open(abs_path, 'r', encoding='utf-8') as file:
+            sections.append(f'--- {file_path} ---\n{file.read()}')
+    return "\n\n".join(sections)
+
+
+# Cache name -> InlineContext sending the same prefix, for requests moved to another model
+_inline_fallbacks = {}
+
+
+def inline_config(cached_content):
+    """Return a config sending inline the prefix held by the named cache."""
+    return _inline_fallbacks.get(cached_content, InlineContext()).config()
+
+
+class InlineContext:
+    """
+    Sends the system prompt and tool declarations with every request.
+
+    Used when explicit caching is unavailable, e.g. the prefix is below the
+    model's minimum cacheable size or the API key has no caching access.
+    """
+
+    cached = False
+
+    def __init__(self, system_instruction=system_prompt):
+        self.system_instruction = system_instruction
+
+    def config(self):
+        return types.GenerateContentConfig(
+            tools=[get_available_functions()],
+            system_instruction=self.system_instruction,
+        )
+
+    def close(self):
+        pass
+
+
+class GeminiContextCache:
+    """
+    Gemini explicit context cache holding the static prefix of every request.
+
+    The system instruction, with any pinned files, and the tool
+    declarations are uploaded once; requests then refer to the cache by
+    name instead of resending them. The cache's TTL is extended while it
+    is in use and the cache is deleted by close(). If the cache cannot be kept alive, requests
+    fall back to sending the prefix inline.
+    """
+
+    cached = True
+
+    def __init__(self, client, model=MODEL_NAME, system_instruction=system_prompt, ttl_seconds=CONTEXT_CACHE_TTL_SECONDS):
+        self.client = client
+        self.ttl_seconds = ttl_seconds
+        self._fallback = InlineContext(system_instruction)
+        cache = client.caches.create(
+            model=model,
+            config=types.CreateCachedContentConfig(
+                display_name="agentic-static-prefix",
+                system_instruction=system_instruction,
+                tools=[get_available_functions()],
+                ttl=f"{ttl_seconds}s",
+            ),
+        )
+        self.name = cache.name
+        _inline_fallbacks[self.name] = self._fallback
+        self._expires_at = time.monotonic() + ttl_seconds
+
+    def config(self):
+        if self.name is None:
+            return self._fallback.config()
+
+        if time.monotonic() > self._expires_at - TTL_REFRESH_MARGIN_SECONDS:
+            try:
+                self.client.caches.update(
+                    name=self.name,
+                    config=types.UpdateCachedContentConfig(ttl=f"{self.ttl_seconds}s"),
+                )
+                self._expires_at = time.monotonic() + self.ttl_seconds
+            except Exception:
+                _inline_fallbacks.pop(self.name, None)
+                self.name = None
+                self.cached = False
+                return self._fallback.config()
+
+        return types.GenerateContentConfig(cached_content=self.name)
+
+    def close(self):
+        if self.name is None:
+            return
+        _inline_fallbacks.pop(self.name, None)
+        try:
+            self.client.caches.delete(name=self.name)
+        except Exception:
+            # The cache expires on its own anyway
+            pass
+        self.name = None
+
+
+def open_context(client, model=MODEL_NAME, pinned_files=(), working_directory=WORKING_DIRECTORY):
+    """
+    Cache the static request prefix if the API allows it.
+
+    A prefix below the model's minimum cacheable size would be refused,
+    so no cache is created for it; pinning large stable files makes the
+    prefix bigger.
+
+    Args:
+        client: A genai.Client
+        model: Model the cache is created for; it only works with that model
+        pinned_files: Paths of stable files, relative to working_directory, to add to the prefix
+        working_directory: The base directory that limits file access
+
+    Returns:
+        GeminiContextCache, or InlineContext if the prefix is too small or the cache could not be created
+    """
+    system_instruction = pinned_instruction(pinned_files, working_directory)
+    if estimate_prefix_tokens(system_instruction) < min_cached_tokens(model):
+        return InlineContext(system_instruction)
+    try:
+        return GeminiContextCache(client, model, system_instruction)
+    except Exception:
+        return InlineContext(system_instruction)
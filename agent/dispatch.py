@@ -0,0 +1,122 @@
+import os
+import contextvars
+from concurrent.futures import ThreadPoolExecutor, wait
+from .config import MAX_PARALLEL_TOOL_CALLS
+
+# Functions that only read from the working directory
+READ_ONLY_FUNCTIONS = frozenset({"get_files_info", "get_file_content", "search_files"})
+
+# Functions that may touch any file in the working directory when they run
+WORKSPACE_WIDE_FUNCTIONS = frozenset({"run_python_file"})
+
+
+def _call_path(function_call_part):
+    """
+    Work out which path a function call touches.
+
+    Args:
+        function_call_part: A types.FunctionCall with .name and .args properties
+
+    Returns:
+        Normalized path relative to the working directory ("." for all of it)
+    """
+    if function_call_part.name in WORKSPACE_WIDE_FUNCTIONS:
+        return "."
+    args = function_call_part.args or {}
+    path = args.get("file_path") or args.get("directory") or "."
+    return os.path.normpath(path)
+
+
+def _paths_overlap(a, b):
+    """Check whether one path is the other or one of its ancestors."""
+    if a == b or a == "." or b == ".":
+        return True
+    return a.startswith(b + os.sep) or b.startswith(a + os.sep)
+
+
+class ToolCallDispatcher:
+    """
+    Run the function calls of one model turn on a thread pool.
+
+    Read-only calls run side by side. A call that writes or runs something
+    waits for every earlier call whose path overlaps its own, and reads wait
+    for earlier writes to the paths they read, so every call sees the same
+    files it would have seen if the calls had run one at a time.
+
+    Use as a context manager; results() returns the tool responses in the
+    order the calls were submitted.
+    """
+
+    def __init__(self, call_function, verbose=False, max_workers=MAX_PARALLEL_TOOL_CALLS):
+        self._call_function = call_function
+        self._verbose = verbose
+        self._executor = ThreadPoolExecutor(max_workers=max_workers)
+        # (path, is_read_only, future) for every call submitted so far
+        self._calls = []
+
+    def submit(self, function_call_part):
+        """
+        Schedule one function call, after any earlier calls it conflicts with.
+
+        Args:
+            function_call_part: A types.FunctionCall with .name and .args properties
+
+        Returns:
+            Future resolving to the types.Content returned by call_function
+        """
+        path = _call_path(function_call_part)
+        read_only = function_call_part.name in READ_ONLY_FUNCTIONS
+
+        # Two calls conflict when their paths overlap and at least one of them writes
+        dependencies = [
+            future
+            for other_path, other_read_only, future in self._calls
+            if not (read_only and other_read_only) and _paths_overlap(path, other_path)
+        ]
+
+        # Run in a copy of the caller's context so tool spans nest under the current trace
+        context = contextvars.copy_context()
+        future = self._executor.submit(context.run, self._run, function_call_part, dependencies)
+        self._calls.append((path, read_only, future))
+        return future
+
+    def _run(self, function_call_part, dependencies):
+        # Dependencies were submitted earlier, so they are already running or done
+        if dependencies:
+            wait(dependencies)
+        return self._call_function(function_call_part, self._verbose)
+
+    def results(self):
+        """Wait for every submitted call and return their results in submission order."""
+        return [future.result() for _, _, future in self._calls]
+
+    def close(self):
+        self._executor.shutdown(wait=True)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+
+def dispatch_function_calls(function_call_parts, call_function, verbose=False):
+    """
+    Run all function calls from one model turn, concurrently where it is safe.
+
+    Args:
+        function_call_parts: List of types.FunctionCall in the order the model sent them
+        call_function: Callable taking (function_call_part, verbose) and returning types.Content
+        verbose: Whether to print detailed output
+
+    Returns:
+        List of types.Content, one per call, in the same order as function_call_parts
+    """
+    # Nothing to overlap with a single call, so skip the thread pool
+    if len(function_call_parts) == 1:
+        return [call_function(function_call_parts[0], verbose)]
+
+    with ToolCallDispatcher(call_function, verbose) as dispatcher:
+        for function_call_part in function_call_parts:
+            dispatcher.submit(function_call_part)
+        return dispatcher.results()
@@ -0,0 +1,184 @@
+import json
+from google.genai import types
+from .config import HISTORY_TOKEN_BUDGET, KEEP_RECENT_TURNS
+
+# Rough characters per token, good enough to decide when to compact
+CHARS_PER_TOKEN = 4
+
+# Functions whose result is the content of the file they name
+FILE_READ_FUNCTIONS = frozenset({"get_file_content"})
+
+# Functions whose call carries the whole new content of the file they name. edit_file
+# is not one: the model sent only the change, so its earlier read is still its copy.
+FILE_WRITE_FUNCTIONS = frozenset({"write_file"})
+
+# Longest text kept for one line of the summary
+MAX_SUMMARY_LINE_CHARS = 200
+
+# Oldest summary lines are dropped beyond this
+MAX_SUMMARY_LINES = 100
+
+OMITTED_PREFIX = "[Omitted:"
+
+
+def estimate_tokens(messages):
+    """
+    Estimate the prompt size of a conversation without calling the API.
+
+    Args:
+        messages: List of types.Content
+
+    Returns:
+        Approximate number of tokens
+    """
+    chars = 0
+    for content in messages:
+        for part in content.parts or []:
+            if part.text:
+                chars += len(part.text)
+            elif part.function_call:
+                chars += len(part.function_call.name) + len(str(part.function_call.args))
+            elif part.function_response:
+                chars += len(str(part.function_response.response))
+    return chars // CHARS_PER_TOKEN
+
+
+def _tool_response(name, note):
+    return types.Content(
+        role="tool",
+        parts=[types.Part.from_function_response(name=name, response={"result": note})],
+    )
+
+
+def _format_call(function_call):
+    args = ", ".join(f"{key}={value!r}" for key, value in (function_call.args or {}).items())
+    return f"{function_call.name}({args})"
+
+
+def _shorten(text):
+    text = " ".join(str(text).split())
+    if len(text) > MAX_SUMMARY_LINE_CHARS:
+        return text[:MAX_SUMMARY_LINE_CHARS] + "..."
+    return text
+
+
+def _read_key(args):
+    """Identify the part of a file a read returned: a read of another range does not replace it."""
+    offset = args.get("offset") or 0
+    length = args.get("length")
+    try:
+        return args.get("file_path"), int(offset), None if length is None else int(length)
+    except (TypeError, ValueError):
+        return args.get("file_path"), str(offset), str(length)
+
+
+class HistoryManager:
+    """
+    Keeps the conversation sent to the model from growing without bound.
+
+    Before each request, compact() rewrites the message list:
+
+    - a tool result identical to a later call's result is replaced by a note
+    - file contents that were read again (same range) or rewritten whole by
+      write_file later are replaced by a short reference, since the model has
+      a newer copy further down; failed reads and writes and edit_file
+      changes do not count
+    - once the estimated size is over token_budget, the oldest turns (except
+      the most recent keep_recent_turns) are folded into a running summary
+      attached to the user prompt
+    """
+
+    def __init__(self, token_budget=HISTORY_TOKEN_BUDGET, keep_recent_turns=KEEP_RECENT_TURNS):
+        self.token_budget = token_budget
+        self.keep_recent_turns = keep_recent_turns
+        self.summary_lines = []
+
+    def compact(self, messages):
+        """
+        Compact a conversation.
+
+        Args:
+            messages: List of types.Content, starting with the user prompt
+
+        Returns:
+            New list of types.Content to send instead
+        """
+        messages = self._drop_superseded_results(messages)
+        if estimate_tokens(messages) > self.token_budget:
+            messages = self._summarize_old_turns(messages)
+        return messages
+
+    def _pair_calls(self, messages):
+        """Yield (index, function_call, function_response) for every tool result."""
+        pending = []
+        for index, content in enumerate(messages):
+            if content.role == "model":
+                pending = [part.function_call for part in content.parts or [] if part.function_call]
+            else:
+                for part in content.parts or []:
+                    if part.function_response and pending:
+                        yield index, pending.pop(0), part.function_response
+
+    def _drop_superseded_results(self, messages):
+        messages = list(messages)
+        seen_results = set()
+        later_reads = set()
+        later_written_paths = set()
+
+        # Walk newest first, so every result is compared with what came after it
+        for index, function_call, function_response in reversed(list(self._pair_calls(messages))):
+            name = function_call.name
+            args = function_call.args or {}
+            response = function_response.response or {}
+            result = str(response.get("result", ""))
+            if result.startswith(OMITTED_PREFIX):
+                continue
+
+            file_path = args.get("file_path")
+            read_key = _read_key(args)
+            result_key = (name, json.dumps(args, sort_keys=True, default=str), str(response))
+
+            if result_key in seen_results:
+                messages[index] = _tool_response(name, f"{OMITTED_PREFIX} same result as a later {name} call]")
+            elif name in FILE_READ_FUNCTIONS and (read_key in later_reads or file_path in later_written_paths):
+                messages[index] = _tool_response(
+                    name, f'{OMITTED_PREFIX} earlier content of "{file_path}"; it was read again or changed later]'
+                )
+
+            seen_results.add(result_key)
+            # A failed read or write leaves the earlier content as the model's latest copy
+            if not file_path or "error" in response or result.startswith("Error:"):
+                continue
+            if name in FILE_READ_FUNCTIONS:
+                later_reads.add(read_key)
+            elif name in FILE_WRITE_FUNCTIONS:
+                later_written_paths.add(file_path)
+
+        return messages
+
+    def _summarize_old_turns(self, messages):
+        # A turn starts at a model message and runs until the next one
+        turn_starts = [index for index, content in enumerate(messages) if content.role == "model"]
+        if len(turn_starts) <= self.keep_recent_turns:
+            return messages
+        cut = turn_starts[-self.keep_recent_turns] if self.keep_recent_turns else len(messages)
+
+        calls = dict(
+            (index, function_call)
+            for index, function_call, _ in self._pair_calls(messages[:cut])
+        )
+        for index, content in enumerate(messages[1:cut], start=1):
+            for part in content.parts or []:
+                if part.text:
+                    self.summary_lines.append(f"- Model said: {_shorten(part.text)}")
+                elif part.function_response:
+                    response = part.function_response.response or {}
+                    outcome = response.get("error") or response.get("result", "")
+                    call = _format_call(calls[index]) if index in calls else part.function_response.name
+                    self.summary_lines.append(f"- Called {call} -> {_shorten(outcome)}")
+        del self.summary_lines[:-MAX_SUMMARY_LINES]
+
+        # The prompt is always the first part of the first message; the summary rides along with it
+        prompt = messages[0].parts[0]
+        summary = types.Part(text="Summary of earlier steps in this conversation:\n" + "\n".join(self.summary_lines))
+        return [types.Content(role="user", parts=[prompt, summary])] + messages[cut:]
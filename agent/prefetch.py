@@ -0,0 +1,142 @@
+import os
+import re
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from functions.get_file_content import prefetch_file_content
+from functions.paths import sandbox_root
+from .config import PREFETCH_MAX_FILES, PREFETCH_WORKERS, WORKING_DIRECTORY
+
+# One line of get_files_info output
+LISTING_ENTRY = re.compile(r"^ - (.+): file_size=\d+ bytes, is_dir=(True|False)$", re.MULTILINE)
+
+# "import a.b" and "from .a.b import c, d"; a regex rather than ast, since reads are often truncated mid-file
+IMPORT_STATEMENT = re.compile(
+    r"^[ \t]*(?:from[ \t]+(\.*)([\w.]*)[ \t]+import[ \t]+\(?([\w \t,]+)|import[ \t]+([\w.]+))",
+    re.MULTILINE,
+)
+
+# Shared by every session; prefetching is a background nicety and should stay small
+_executor = None
+_executor_lock = threading.Lock()
+
+
+def _get_executor():
+    global _executor
+    with _executor_lock:
+        if _executor is None:
+            _executor = ThreadPoolExecutor(max_workers=PREFETCH_WORKERS, thread_name_prefix="prefetch")
+        return _executor
+
+
+class Prefetcher:
+    """
+    Reads the files the model is likely to ask for next into a session's FileReadCache.
+
+    After each turn the tool results are scanned for likely next reads:
+    Python files in a directory just listed, modules imported by a file
+    just read, and the tests or source paired with it. Those are read in
+    the background while the next generate_content request is in flight,
+    so the model's get_file_content call finds them cached. The cache
+    counts how many prefetched entries were used.
+    """
+
+    def __init__(self, read_cache, working_directory=WORKING_DIRECTORY, max_files=PREFETCH_MAX_FILES):
+        self.read_cache = read_cache
+        self.root = sandbox_root(working_directory)
+        self.max_files = max_files
+        # Paths already read by the model or queued for prefetching
+        self._seen = set()
+
+    def observe(self, function_calls, results):
+        """
+        Queue prefetches suggested by one turn's tool calls and their results.
+
+        Args:
+            function_calls: List of types.FunctionCall from the model's turn
+            results: List of types.Content responses, in the same order
+        """
+        candidates = []
+        for function_call, result in zip(function_calls, results):
+            args = function_call.args or {}
+            response = result.parts[0].function_response.response or {}
+            output = response.get("result")
+            if not isinstance(output, str) or output.startswith("Error:"):
+                continue
+
+            if function_call.name == "get_file_content" and args.get("file_path"):
+                file_path = os.path.normpath(args["file_path"])
+                self._seen.add(file_path)
+                if file_path.endswith(".py"):
+                    candidates += self._imported_files(file_path, output)
+                    candidates += self._paired_files(file_path)
+            elif function_call.name == "get_files_info":
+                candidates += self._listed_files(args.get("directory") or ".", output)
+
+        queued = []
+        for path in candidates:
+            if path not in self._seen and len(queued) < self.max_files:
+                self._seen.add(path)
+                queued.append(path)
+        for path in queued:
+            _get_executor().submit(prefetch_file_content, self.root, path, self.read_cache)
+
+    def _exists(self, rel_path):
+        return os.path.isfile(os.path.join(self.root, rel_path))
+
+    def _listed_files(self, directory, output):
+        files = [
+            os.path.normpath(os.path.join(directory, name))
+            for name, is_dir in LISTING_ENTRY.findall(output)
+            if is_dir == "False"
+        ]
+        # Source files first; the rest only if there is room
+        return [path for path in files if path.endswith(".py")] + [path for path in files if not path.endswith(".py")]
+
+    def _imported_files(self, file_path, content):
+        directory = os.path.dirname(file_path)
+        modules = []
+        for dots, module, names, plain_module in IMPORT_STATEMENT.findall(content):
+            if plain_module:
+                modules.append(([directory, "."], plain_module.split(".")))
+                continue
+            if dots:
+                # Relative import: one dot is this package, each extra dot a parent
+                base = os.path.normpath(os.path.join(directory, *([".."] * (len(dots) - 1))))
+                bases = [base]
+            else:
+                bases = [directory, "."]
+            parts = module.split(".") if module else []
+            if parts:
+                modules.append((bases, parts))
+            # "from pkg import render" may name a submodule
+            for name in names.split(","):
+                name = name.strip().split(" ")[0]
+                if name and name != "*":
+                    modules.append((bases, parts + [name]))
+
+        found = []
+        for bases, parts in modules:
+            for base in bases:
+                for candidate in (os.path.join(base, *parts) + ".py", os.path.join(base, *parts, "__init__.py")):
+                    candidate = os.path.normpath(candidate)
+                    if not candidate.startswith("..") and self._exists(candidate):
+                        found.append(candidate)
+        return found
+
+    def _paired_files(self, file_path):
+        directory, name = os.path.split(file_path)
+        stem = name[:-len(".py")]
+        parent = os.path.dirname(directory)
+        if stem.startswith("test_"):
+            candidates = [os.path.join(directory, stem[5:] + ".py"), os.path.join(parent, stem[5:] + ".py")]
+        elif stem == "tests":
+            candidates = []
+        else:
+            candidates = [
+                os.path.join(directory, f"test_{stem}.py"),
+                os.path.join(directory, "tests", f"test_{stem}.py"),
+                os.path.join("tests", f"test_{stem}.py"),
+                os.path.join(directory, "tests.py"),
+                os.path.join(parent, "tests.py"),
+            ]
+        return [os.path.normpath(path) for path in candidates if self._exists(os.path.normpath(path))]
@@ -0,0 +1,172 @@
+import json
+import hashlib
+import threading
+from types import SimpleNamespace
+from collections import defaultdict, deque
+from google.genai import types
+
+
+class ReplayMismatchError(Exception):
+    """Raised by a strict ReplayClient when a request was never recorded."""
+
+
+def _dump_contents(contents):
+    return [content.model_dump(mode="json", exclude_none=True) for content in contents]
+
+
+def request_fingerprint(model, contents):
+    """
+    Identify a request by its model and conversation, ignoring the config.
+
+    The config is left out on purpose: it carries per-run values such as the
+    context cache name.
+    """
+    payload = json.dumps({"model": model, "contents": _dump_contents(contents)}, sort_keys=True)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class _Recorder:
+    def __init__(self, path):
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def write(self, model, contents, responses):
+        record = {
+            "fingerprint": request_fingerprint(model, contents),
+            "model": model,
+            "contents": _dump_contents(contents),
+            "responses": [response.model_dump(mode="json", exclude_none=True) for response in responses],
+        }
+        with self._lock:
+            self._file.write(json.dumps(record) + "\n")
+            self._file.flush()
+
+
+class _RecordingModels:
+    def __init__(self, models, recorder):
+        self._models = models
+        self._recorder = recorder
+
+    def generate_content(self, *, model, contents, config=None):
+        response = self._models.generate_content(model=model, contents=contents, config=config)
+        self._recorder.write(model, contents, [response])
+        return response
+
+    def generate_content_stream(self, *, model, contents, config=None):
+        chunks = []
+        for chunk in self._models.generate_content_stream(model=model, contents=contents, config=config):
+            chunks.append(chunk)
+            yield chunk
+        self._recorder.write(model, contents, chunks)
+
+
+class _AsyncRecordingModels:
+    def __init__(self, models, recorder):
+        self._models = models
+        self._recorder = recorder
+
+    async def generate_content(self, *, model, contents, config=None):
+        response = await self._models.generate_content(model=model, contents=contents, config=config)
+        self._recorder.write(model, contents, [response])
+        return response
+
+
+class RecordingClient:
+    """
+    Wraps a genai.Client and appends every generate_content exchange to a JSONL file.
+
+    The file can later be fed to ReplayClient to rerun the session offline.
+    Everything other than generate_content is passed through to the real client.
+    """
+
+    def __init__(self, client, path):
+        self._client = client
+        recorder = _Recorder(path)
+        self.models = _RecordingModels(client.models, recorder)
+        self.aio = SimpleNamespace(models=_AsyncRecordingModels(client.aio.models, recorder))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+
+class _Unavailable:
+    """Stands in for APIs a replay cannot serve, e.g. context caches."""
+
+    def __getattr__(self, name):
+        def unavailable(*args, **kwargs):
+            raise NotImplementedError(f"{name} is not available while replaying")
+        return unavailable
+
+
+class _ReplayModels:
+    def __init__(self, replay):
+        self._replay = replay
+
+    def generate_content(self, *, model, contents, config=None):
+        return self._replay.next_responses(model, contents)[-1]
+
+    def generate_content_stream(self, *, model, contents, config=None):
+        yield from self._replay.next_responses(model, contents)
+
+
+class _AsyncReplayModels:
+    def __init__(self, replay):
+        self._replay = replay
+
+    async def generate_content(self, *, model, contents, config=None):
+        return self._replay.next_responses(model, contents)[-1]
+
+
+class ReplayClient:
+    """
+    Stand-in for genai.Client that answers from a recorded JSONL file, with no network.
+
+    Requests are matched to recordings by fingerprint, so concurrent
+    sessions replay correctly in any order. When a request was not
+    recorded exactly (e.g. a tool result changed), a strict client raises
+    ReplayMismatchError; otherwise it falls back to the next unused
+    recording in file order, which is what canned benchmark sessions rely on.
+    """
+
+    def __init__(self, path, strict=False):
+        self.strict = strict
+        self._by_fingerprint = defaultdict(deque)
+        self._in_order = deque()
+        self._used = set()
+        self._lock = threading.Lock()
+
+        with open(path, 'r', encoding='utf-8') as file:
+            for index, line in enumerate(file):
+                if not line.strip():
+                    continue
+                record = json.loads(line)
+                responses = [types.GenerateContentResponse.model_validate(response) for response in record["responses"]]
+                self._by_fingerprint[record.get("fingerprint")].append(index)
+                self._in_order.append((index, responses))
+
+        self._responses = dict(self._in_order)
+        self.models = _ReplayModels(self)
+        self.aio = SimpleNamespace(models=_AsyncReplayModels(self))
+        self.caches = _Unavailable()
+
+    def next_responses(self, model, contents):
+        """Return the recorded responses (stream chunks) for a request."""
+        fingerprint = request_fingerprint(model, contents)
+        with self._lock:
+            matches = self._by_fingerprint.get(fingerprint)
+            while matches:
+                index = matches.popleft()
+                if index not in self._used:
+                    self._used.add(index)
+                    return self._responses[index]
+
+            if self.strict:
+                raise ReplayMismatchError(f"No recorded response for request {fingerprint[:12]}")
+
+            while self._in_order:
+                index, responses = self._in_order.popleft()
+                if index not in self._used:
+                    self._used.add(index)
+                    return responses
+
+        raise ReplayMismatchError("Ran out of recorded responses")
@@ -0,0 +1,111 @@
+import asyncio
+from functools import partial
+import tracing
+from .config import MAX_IN_FLIGHT_REQUESTS
+from .context_cache import open_context
+from .dispatch import dispatch_function_calls
+from .session import AgentSession
+from .tools import call_function
+
+
+async def call_function_async(function_call_part, verbose=False, read_cache=None):
+    """
+    Run call_function on a worker thread so the event loop keeps serving other sessions.
+
+    Args:
+        function_call_part: A types.FunctionCall with .name and .args properties
+        verbose: Whether to print detailed output
+        read_cache: Optional FileReadCache for the session making the call
+
+    Returns:
+        types.Content with the function result
+    """
+    return await asyncio.to_thread(call_function, function_call_part, verbose, read_cache)
+
+
+async def dispatch_function_calls_async(function_call_parts, verbose=False, read_cache=None):
+    """
+    Async counterpart of dispatch_function_calls.
+
+    Args:
+        function_call_parts: List of types.FunctionCall in the order the model sent them
+        verbose: Whether to print detailed output
+        read_cache: Optional FileReadCache for the session making the calls
+
+    Returns:
+        List of types.Content, one per call, in the same order as function_call_parts
+    """
+    if len(function_call_parts) == 1:
+        return [await call_function_async(function_call_parts[0], verbose, read_cache)]
+    return await asyncio.to_thread(
+        dispatch_function_calls,
+        function_call_parts,
+        partial(call_function, read_cache=read_cache),
+        verbose,
+    )
+
+
+async def run_session_async(session, client, request_slots):
+    """
+    Run one session to completion with the async genai client.
+
+    Args:
+        session: An AgentSession
+        client: A genai.Client; its .aio interface is used
+        request_slots: asyncio.Semaphore bounding model requests in flight
+    """
+    with tracing.span("session", session=session.name, model=session.model):
+        while session.iteration < session.max_iterations:
+            session.start_iteration()
+
+            with tracing.span("generate_content", model=session.model, iteration=session.iteration) as span:
+                async with request_slots:
+                    response = await client.aio.models.generate_content(**session.request())
+                tracing.record_usage(span, response.usage_metadata)
+
+            function_call_parts = session.handle_response(response)
+            if function_call_parts is None:
+                return
+
+            session.add_function_results(
+                await dispatch_function_calls_async(function_call_parts, session.verbose, session.read_cache)
+            )
+
+        session.log(f"Reached maximum iterations ({session.max_iterations})")
+
+
+async def _run_guarded(session, client, request_slots):
+    # One failing session should not take the others down with it
+    try:
+        await run_session_async(session, client, request_slots)
+    except Exception as e:
+        session.log(f"Error during conversation loop: {e}")
+
+
+async def run_sessions(prompts, client, verbose=False, max_in_flight=MAX_IN_FLIGHT_REQUESTS, pinned_files=()):
+    """
+    Run one session per prompt concurrently in this process.
+
+    Args:
+        prompts: Iterable of user prompts
+        client: A genai.Client shared by every session
+        verbose: Whether to print detailed output
+        max_in_flight: Maximum number of model requests in flight at once
+        pinned_files: Paths of stable files to add to the shared prefix
+
+    Returns:
+        List of AgentSession in the same order as prompts
+    """
+    request_slots = asyncio.Semaphore(max_in_flight)
+
+    # Every session sends the same prefix, so they share one context cache
+    context = await asyncio.to_thread(open_context, client, pinned_files=pinned_files)
+    sessions = [
+        AgentSession(prompt, verbose=verbose, name=f"session-{index}", context=context)
+        for index, prompt in enumerate(prompts, start=1)
+    ]
+    try:
+        await asyncio.gather(*(_run_guarded(session, client, request_slots) for session in sessions))
+    finally:
+        await asyncio.to_thread(context.close)
+    return sessions
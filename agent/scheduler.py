@@ -0,0 +1,321 @@
+import time
+import random
+import asyncio
+import threading
+from email.utils import parsedate_to_datetime
+from types import SimpleNamespace
+import httpx
+from google import genai
+from google.genai import errors, types
+import tracing
+from .config import (
+    FALLBACK_MODELS,
+    MAX_IN_FLIGHT_REQUESTS,
+    MAX_REQUEST_RETRIES,
+    REQUESTS_PER_MINUTE,
+    RETRY_BASE_DELAY_SECONDS,
+    RETRY_MAX_DELAY_SECONDS,
+    TOKENS_PER_MINUTE,
+)
+from .context_cache import inline_config
+from .history import estimate_tokens
+
+# Status codes worth retrying on the same model
+RETRYABLE_STATUS_CODES = frozenset({429, 500, 502, 503, 504})
+
+# Status codes that mean this model will not serve the request, but another might
+FALLBACK_STATUS_CODES = frozenset({404})
+
+# Returned by ScheduledClient.retry_delay to give up on a model and try the next
+NEXT_MODEL = object()
+
+
+def create_client(api_key, base_url=None, max_connections=MAX_IN_FLIGHT_REQUESTS):
+    """
+    Create a genai.Client whose HTTP connections are pooled and kept alive.
+
+    One client is shared by every session, so requests reuse warm
+    connections instead of opening one each.
+
+    Args:
+        api_key: Gemini API key
+        base_url: Optional endpoint override, e.g. a local fake server
+        max_connections: Size of the connection pool
+
+    Returns:
+        genai.Client
+    """
+    limits = httpx.Limits(max_connections=max_connections, max_keepalive_connections=max_connections)
+    http_options = types.HttpOptions(
+        base_url=base_url,
+        client_args={"limits": limits},
+        async_client_args={"limits": limits},
+    )
+    return genai.Client(api_key=api_key, http_options=http_options)
+
+
+class TokenBucket:
+    """
+    Token bucket refilled continuously at a per-minute rate.
+
+    reserve() takes the tokens at once, going into debt if need be, and
+    returns how long the caller must wait before using them. Callers are
+    served in the order they reserve, and the same bucket works for
+    threads and for coroutines since the caller does the waiting.
+    """
+
+    def __init__(self, per_minute):
+        self.capacity = per_minute
+        self.rate = per_minute / 60
+        self._tokens = per_minute
+        self._updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def reserve(self, amount=1):
+        with self._lock:
+            now = time.monotonic()
+            self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+            self._updated = now
+            self._tokens -= amount
+            return max(0.0, -self._tokens / self.rate)
+
+    def adjust(self, amount):
+        """Take (or with a negative amount, give back) tokens without waiting, e.g. to correct an estimate."""
+        with self._lock:
+            self._tokens = min(self.capacity, self._tokens - amount)
+
+
+def retry_after_seconds(error):
+    """
+    Read how long the server asked us to wait from an APIError, if it said.
+
+    Looks at the Retry-After header (seconds or an HTTP date) and at the
+    RetryInfo detail Gemini puts in 429 bodies.
+    """
+    response = getattr(error, "response", None)
+    header = response.headers.get("retry-after") if response is not None and hasattr(response, "headers") else None
+    if header:
+        try:
+            return max(0.0, float(header))
+        except ValueError:
+            try:
+                return max(0.0, parsedate_to_datetime(header).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+
+    details = error.details.get("error", {}).get("details", []) if isinstance(error.details, dict) else []
+    for detail in details:
+        if isinstance(detail, dict) and detail.get("@type", "").endswith("RetryInfo"):
+            try:
+                return float(str(detail.get("retryDelay", "")).rstrip("s"))
+            except ValueError:
+                pass
+    return None
+
+
+class ScheduledClient:
+    """
+    Wraps a genai.Client so model requests respect quota and survive transient errors.
+
+    Every request waits for the shared request and token buckets. A 429,
+    5xx or connection error is retried with jittered exponential backoff,
+    or after the delay the server gave; a 429 holds back every other
+    request for that long too. When a model keeps failing, or does not
+    exist, the next model in fallback_models is tried. Everything other
+    than generate_content is passed through to the wrapped client.
+    """
+
+    def __init__(
+        self,
+        client,
+        fallback_models=FALLBACK_MODELS,
+        requests_per_minute=REQUESTS_PER_MINUTE,
+        tokens_per_minute=TOKENS_PER_MINUTE,
+        max_retries=MAX_REQUEST_RETRIES,
+        base_delay=RETRY_BASE_DELAY_SECONDS,
+        max_delay=RETRY_MAX_DELAY_SECONDS,
+    ):
+        self._client = client
+        self.fallback_models = tuple(fallback_models)
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max_retries
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._paused_until = 0.0
+        # Models that answered 404; later requests skip them
+        self._unavailable = set()
+        self._lock = threading.Lock()
+        self.stats = {"requests": 0, "retries": 0, "fallbacks": 0, "throttled_seconds": 0.0}
+        self.models = _ScheduledModels(self)
+        self.aio = SimpleNamespace(models=_AsyncScheduledModels(self))
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def candidates(self, model, config):
+        """Yield (model, config) for the requested model, then each fallback not known to be missing."""
+        fallbacks = [fallback for fallback in self.fallback_models if fallback != model and fallback not in self._unavailable]
+        if model not in self._unavailable or not fallbacks:
+            yield model, config
+        for fallback in fallbacks:
+            # A context cache belongs to the model it was created for
+            if config is not None and config.cached_content:
+                config = inline_config(config.cached_content)
+            yield fallback, config
+
+    def reserve(self, estimated_tokens):
+        """Take quota for one request and return how long to wait before sending it."""
+        delay = max(self.requests.reserve(1), self.tokens.reserve(estimated_tokens))
+        with self._lock:
+            delay = max(delay, self._paused_until - time.monotonic())
+            self.stats["requests"] += 1
+            if delay > 0:
+                self.stats["throttled_seconds"] += delay
+        if delay > 0:
+            tracing.current_span().add("throttled_ms", round(delay * 1000))
+        return max(delay, 0.0)
+
+    def settle(self, estimated_tokens, response):
+        """Charge the token bucket for what the request actually used."""
+        usage = response.usage_metadata
+        if usage is not None and usage.total_token_count is not None:
+            self.tokens.adjust(usage.total_token_count - estimated_tokens)
+
+    def retry_delay(self, error, model, attempt):
+        """
+        Decide what to do about a failed request.
+
+        Returns:
+            Seconds to wait before retrying the same model, NEXT_MODEL to
+            move to the next model, or None if the error is final
+        """
+        if isinstance(error, errors.APIError):
+            if error.code in FALLBACK_STATUS_CODES:
+                with self._lock:
+                    self._unavailable.add(model)
+                return NEXT_MODEL
+            if error.code not in RETRYABLE_STATUS_CODES:
+                return None
+        elif not isinstance(error, httpx.TransportError):
+            return None
+        if attempt >= self.max_retries:
+            return NEXT_MODEL
+
+        backoff = random.uniform(0, min(self.max_delay, self.base_delay * 2 ** attempt))
+        server_delay = retry_after_seconds(error) if isinstance(error, errors.APIError) else None
+        if server_delay is not None:
+            # Spread the retries out a little so they do not all land together
+            backoff = server_delay + random.uniform(0, self.base_delay)
+            if error.code == 429:
+                with self._lock:
+                    self._paused_until = max(self._paused_until, time.monotonic() + server_delay)
+        with self._lock:
+            self.stats["retries"] += 1
+        tracing.current_span().add("retries")
+        return backoff
+
+    def note_fallback(self, model):
+        with self._lock:
+            self.stats["fallbacks"] += 1
+        tracing.current_span().set("fallback_model", model)
+
+
+class _ScheduledModels:
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+
+    def generate_content(self, *, model, contents, config=None):
+        scheduler = self._scheduler
+        estimate = estimate_tokens(contents)
+        last_error = None
+        for candidate, candidate_config in scheduler.candidates(model, config):
+            if candidate != model:
+                scheduler.note_fallback(candidate)
+            attempt = 0
+            while True:
+                time.sleep(scheduler.reserve(estimate))
+                try:
+                    response = scheduler._client.models.generate_content(
+                        model=candidate, contents=contents, config=candidate_config
+                    )
+                except Exception as e:
+                    last_error = e
+                    delay = scheduler.retry_delay(e, candidate, attempt)
+                    if delay is None:
+                        raise
+                    if delay is NEXT_MODEL:
+                        break
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                scheduler.settle(estimate, response)
+                return response
+        raise last_error
+
+    def generate_content_stream(self, *, model, contents, config=None):
+        # Only a stream that fails before its first chunk can be retried
+        scheduler = self._scheduler
+        estimate = estimate_tokens(contents)
+        last_error = None
+        for candidate, candidate_config in scheduler.candidates(model, config):
+            if candidate != model:
+                scheduler.note_fallback(candidate)
+            attempt = 0
+            while True:
+                time.sleep(scheduler.reserve(estimate))
+                chunk = None
+                try:
+                    for chunk in scheduler._client.models.generate_content_stream(
+                        model=candidate, contents=contents, config=candidate_config
+                    ):
+                        yield chunk
+                except Exception as e:
+                    if chunk is not None:
+                        raise
+                    last_error = e
+                    delay = scheduler.retry_delay(e, candidate, attempt)
+                    if delay is None:
+                        raise
+                    if delay is NEXT_MODEL:
+                        break
+                    time.sleep(delay)
+                    attempt += 1
+                    continue
+                if chunk is not None:
+                    scheduler.settle(estimate, chunk)
+                return
+        raise last_error
+
+
+class _AsyncScheduledModels:
+    def __init__(self, scheduler):
+        self._scheduler = scheduler
+
+    async def generate_content(self, *, model, contents, config=None):
+        scheduler = self._scheduler
+        estimate = estimate_tokens(contents)
+        last_error = None
+        for candidate, candidate_config in scheduler.candidates(model, config):
+            if candidate != model:
+                scheduler.note_fallback(candidate)
+            attempt = 0
+            while True:
+                await asyncio.sleep(scheduler.reserve(estimate))
+                try:
+                    response = await scheduler._client.aio.models.generate_content(
+                        model=candidate, contents=contents, config=candidate_config
+                    )
+                except Exception as e:
+                    last_error = e
+                    delay = scheduler.retry_delay(e, candidate, attempt)
+                    if delay is None:
+                        raise
+                    if delay is NEXT_MODEL:
+                        break
+                    await asyncio.sleep(delay)
+                    attempt += 1
+                    continue
+                scheduler.settle(estimate, response)
+                return response
+        raise last_error
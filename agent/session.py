@@ -0,0 +1,250 @@
+import time
+from google.genai import types
+from functions.file_cache import FileReadCache
+import tracing
+from .config import MODEL_NAME, MAX_ITERATIONS
+from .dispatch import ToolCallDispatcher, dispatch_function_calls
+from .history import HistoryManager, estimate_tokens
+from .context_cache import InlineContext
+from .prefetch import Prefetcher
+from .tools import call_function
+
+
+class AgentSession:
+    """
+    One conversation between a user prompt and the model.
+
+    Holds the message history and per-conversation settings, so any number
+    of sessions can be driven from the same process. run() and
+    run_streaming() drive the conversation with a blocking client;
+    agent.runtime drives it with the async client.
+    """
+
+    def __init__(self, prompt, verbose=False, name=None, model=MODEL_NAME, max_iterations=MAX_ITERATIONS, context=None):
+        self.prompt = prompt
+        self.verbose = verbose
+        self.name = name
+        self.model = model
+        self.max_iterations = max_iterations
+        self.iteration = 0
+        self.final_text = None
+        self.read_cache = FileReadCache()
+        # Reads likely next files into read_cache while the model is thinking
+        self.prefetcher = Prefetcher(self.read_cache)
+        self.history = HistoryManager()
+        # Supplies the system prompt and tools, from a context cache when there is one
+        self.context = context or InlineContext()
+        self.messages = [
+            types.Content(role="user", parts=[types.Part(text=prompt)]),
+        ]
+
+    def log(self, message):
+        """Print a message, prefixed with the session name when there is one."""
+        if self.name:
+            print(f"[{self.name}] {message}")
+        else:
+            print(message)
+
+    def call_tool(self, function_call_part, verbose=False):
+        """call_function bound to this session's file read cache."""
+        return call_function(function_call_part, verbose, read_cache=self.read_cache)
+
+    def start_iteration(self):
+        self.iteration += 1
+        if self.verbose:
+            self.log(f"\n--- Iteration {self.iteration} ---")
+
+        # Keep the prompt from growing with every tool result
+        if self.verbose:
+            before = estimate_tokens(self.messages)
+        self.messages = self.history.compact(self.messages)
+        if self.verbose:
+            after = estimate_tokens(self.messages)
+            if after < before:
+                self.log(f"History compacted: ~{before} -> ~{after} tokens")
+
+    def request(self):
+        """
+        Build the arguments for the next generate_content call.
+
+        Returns:
+            Dictionary of keyword arguments for client.models.generate_content
+        """
+        return {
+            "model": self.model,
+            "contents": self.messages,
+            "config": self.context.config(),
+        }
+
+    def handle_response(self, response):
+        """
+        Record the model's reply and pick out the function calls it asks for.
+
+        Args:
+            response: A types.GenerateContentResponse
+
+        Returns:
+            List of types.FunctionCall to run, or None when the conversation is over
+        """
+        # Check if we have candidates in the response
+        if not response.candidates or not response.candidates[0].content:
+            self.log("No response candidates found")
+            return None
+
+        return self.handle_content(response.candidates[0].content)
+
+    def handle_content(self, candidate_content, streamed=False):
+        """
+        Record the model's content and pick out the function calls it asks for.
+
+        Args:
+            candidate_content: types.Content produced by the model
+            streamed: Whether the text parts were already printed while streaming
+
+        Returns:
+            List of types.FunctionCall to run, or None when the conversation is over
+        """
+        # Add the model's response to our conversation
+        self.messages.append(candidate_content)
+
+        function_call_parts = []
+        text_parts = []
+        for part in candidate_content.parts or []:
+            if hasattr(part, 'function_call') and part.function_call:
+                function_call_parts.append(part.function_call)
+            elif hasattr(part, 'text') and part.text:
+                text_parts.append(part.text)
+                if self.verbose and not streamed:
+                    self.log(f"Model response: {part.text}")
+
+        # If we got a text response and no function calls, we're done
+        if text_parts and not function_call_parts:
+            self.final_text = "".join(text_parts)
+            if not self.verbose and not streamed:
+                self.log(self.final_text)
+            return None
+
+        # If no function calls and no text, something went wrong
+        if not function_call_parts:
+            self.log("No function calls or text response found")
+            return None
+
+        return function_call_parts
+
+    def add_function_results(self, function_call_results):
+        """
+        Append tool responses to the conversation and print them.
+
+        Args:
+            function_call_results: List of types.Content in the order the calls were made
+        """
+        # The model turn that asked for these results is the last message so far
+        function_calls = [part.function_call for part in self.messages[-1].parts or [] if part.function_call]
+
+        for function_call_result in function_call_results:
+            # Validate the response structure
+            if not (function_call_result.parts and
+                    hasattr(function_call_result.parts[0], 'function_response') and
+                    function_call_result.parts[0].function_response and
+                    hasattr(function_call_result.parts[0].function_response, 'response')):
+                raise Exception("Invalid function response structure")
+
+            # Add the tool response to our conversation
+            self.messages.append(function_call_result)
+
+            response_data = function_call_result.parts[0].function_response.response
+            if self.verbose:
+                self.log(f"-> {response_data}")
+            elif "result" in response_data:
+                self.log(response_data["result"])
+            elif "error" in response_data:
+                self.log(response_data["error"])
+
+        # Start reading what the model will probably ask for next, before it is asked
+        self.prefetcher.observe(function_calls, function_call_results)
+
+        if self.verbose:
+            self.log(f"File read cache: {self.read_cache.stats()}")
+
+    def run(self, client):
+        """
+        Run the conversation to completion with a blocking genai client.
+
+        Args:
+            client: A genai.Client
+        """
+        with tracing.span("session", session=self.name, model=self.model):
+            while self.iteration < self.max_iterations:
+                self.start_iteration()
+
+                with tracing.span("generate_content", model=self.model, iteration=self.iteration) as span:
+                    response = client.models.generate_content(**self.request())
+                    tracing.record_usage(span, response.usage_metadata)
+
+                function_call_parts = self.handle_response(response)
+                if function_call_parts is None:
+                    return
+
+                # Call the functions (read-only calls run in parallel) and get results in call order
+                self.add_function_results(
+                    dispatch_function_calls(function_call_parts, self.call_tool, self.verbose)
+                )
+
+            self.log(f"Reached maximum iterations ({self.max_iterations})")
+
+    def run_streaming(self, client):
+        """
+        Run the conversation with the streaming API, starting tools as soon as they arrive.
+
+        Text is printed as it streams in. Each function call is handed to the
+        dispatcher the moment its part is complete, so tools run while the
+        rest of the response is still being generated.
+
+        Args:
+            client: A genai.Client
+        """
+        with tracing.span("session", session=self.name, model=self.model, stream=True):
+            while self.iteration < self.max_iterations:
+                self.start_iteration()
+
+                parts = []
+                with ToolCallDispatcher(self.call_tool, self.verbose) as dispatcher:
+                    with tracing.span("generate_content", model=self.model, iteration=self.iteration, stream=True) as span:
+                        start = time.perf_counter()
+                        first_chunk = True
+                        for chunk in client.models.generate_content_stream(**self.request()):
+                            if first_chunk:
+                                span.set("time_to_first_chunk_ms", (time.perf_counter() - start) * 1000)
+                                first_chunk = False
+                            tracing.record_usage(span, chunk.usage_metadata)
+                            if not chunk.candidates or not chunk.candidates[0].content:
+                                continue
+                            for part in chunk.candidates[0].content.parts or []:
+                                if part.function_call:
+                                    dispatcher.submit(part.function_call)
+                                    parts.append(part)
+                                elif part.text:
+                                    print(part.text, end="", flush=True)
+                                    # Merge streamed text into one part so the history stays compact
+                                    if parts and parts[-1].text is not None:
+                                        parts[-1] = types.Part(text=parts[-1].text + part.text)
+                                    else:
+                                        parts.append(types.Part(text=part.text))
+                    function_call_results = dispatcher.results()
+
+                if any(part.text for part in parts):
+                    print()
+
+                if not parts:
+                    self.log("No response candidates found")
+                    return
+
+                function_call_parts = self.handle_content(
+                    types.Content(role="model", parts=parts), streamed=True
+                )
+                if function_call_parts is None:
+                    return
+
+                self.add_function_results(function_call_results)
+
+            self.log(f"Reached maximum iterations ({self.max_iterations})")
@@ -0,0 +1,416 @@
+# tests.py
+#
+# Run from the repository root: python -m unittest agent.tests
+
+import os
+import time
+import shutil
+import asyncio
+import threading
+import tempfile
+import unittest
+from types import SimpleNamespace
+from google.genai import errors, types
+from agent import context_cache
+from agent.context_cache import GeminiContextCache, InlineContext, inline_config, open_context
+from agent.dispatch import _call_path, _paths_overlap, dispatch_function_calls
+from agent.history import OMITTED_PREFIX, HistoryManager
+from agent.scheduler import NEXT_MODEL, ScheduledClient, TokenBucket, create_client
+from agent.tools import system_prompt
+from benchmarks.fake_gemini import FakeGeminiServer
+
+
+class FakeCaches:
+    """Records caches.* calls the way a genai.Client would receive them."""
+
+    def __init__(self, fail_create=False, fail_update=False):
+        self.fail_create = fail_create
+        self.fail_update = fail_update
+        self.created = []
+        self.updated = []
+        self.deleted = []
+
+    def create(self, model, config):
+        if self.fail_create:
+            raise RuntimeError("caching is not available")
+        self.created.append((model, config))
+        return SimpleNamespace(name=f"cachedContents/{len(self.created)}")
+
+    def update(self, name, config):
+        if self.fail_update:
+            raise RuntimeError("cache expired")
+        self.updated.append(name)
+
+    def delete(self, name):
+        self.deleted.append(name)
+
+
+class TestContextCache(unittest.TestCase):
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        # Large enough to take the prefix past the cacheable minimum
+        with open(os.path.join(self.root, "spec.md"), "w") as file:
+            file.write("stable line of the spec\n" * 1000)
+        with open(os.path.join(self.root, "small.py"), "w") as file:
+            file.write("x = 1\n")
+
+    def open(self, caches, pinned_files=()):
+        client = SimpleNamespace(caches=caches)
+        context = open_context(client, "gemini-2.0-flash-001", pinned_files, self.root)
+        self.addCleanup(context.close)
+        return context
+
+    def test_small_prefix_is_sent_inline_without_calling_the_api(self):
+        caches = FakeCaches()
+        context = self.open(caches, ["small.py"])
+        self.assertIsInstance(context, InlineContext)
+        self.assertEqual(caches.created, [])
+        config = context.config()
+        self.assertIsNone(config.cached_content)
+        self.assertIn("x = 1", config.system_instruction)
+        self.assertTrue(config.system_instruction.startswith(system_prompt))
+
+    def test_pinned_files_are_cached(self):
+        caches = FakeCaches()
+        context = self.open(caches, ["spec.md"])
+        self.assertIsInstance(context, GeminiContextCache)
+        model, cache_config = caches.created[0]
+        self.assertEqual(model, "gemini-2.0-flash-001")
+        self.assertIn("--- spec.md ---\nstable line of the spec\n", cache_config.system_instruction)
+
+        config = context.config()
+        self.assertEqual(config.cached_content, "cachedContents/1")
+        self.assertIsNone(config.system_instruction)
+        # A request moved to another model sends the same prefix inline
+        self.assertEqual(inline_config(config.cached_content).system_instruction, cache_config.system_instruction)
+
+        context.close()
+        self.assertEqual(caches.deleted, ["cachedContents/1"])
+        self.assertNotIn("cachedContents/1", context_cache._inline_fallbacks)
+
+    def test_create_failure_falls_back_inline(self):
+        context = self.open(FakeCaches(fail_create=True), ["spec.md"])
+        self.assertIsInstance(context, InlineContext)
+        self.assertIn("stable line of the spec", context.config().system_instruction)
+
+    def test_expired_cache_falls_back_inline(self):
+        caches = FakeCaches(fail_update=True)
+        context = self.open(caches, ["spec.md"])
+        context._expires_at = 0
+        config = context.config()
+        self.assertFalse(context.cached)
+        self.assertIsNone(config.cached_content)
+        self.assertIn("stable line of the spec", config.system_instruction)
+
+    def test_pin_outside_working_directory(self):
+        with self.assertRaises(ValueError):
+            self.open(FakeCaches(), ["../spec.md"])
+
+
+def tool_turn(*calls):
+    """A model message making the calls, then the tool message with their results, as the session builds them."""
+    model = types.Content(
+        role="model",
+        parts=[types.Part(function_call=types.FunctionCall(name=name, args=args)) for name, args, _ in calls],
+    )
+    tool = types.Content(
+        role="tool",
+        parts=[types.Part.from_function_response(name=name, response={"result": result}) for name, _, result in calls],
+    )
+    return [model, tool]
+
+
+def results(messages):
+    return [
+        part.function_response.response["result"]
+        for content in messages
+        for part in content.parts or []
+        if part.function_response
+    ]
+
+
+class TestHistoryManager(unittest.TestCase):
+    def setUp(self):
+        self.history = HistoryManager(token_budget=10**9, keep_recent_turns=2)
+        self.prompt = types.Content(role="user", parts=[types.Part(text="Fix the bug")])
+
+    def compact(self, *turns):
+        messages = [self.prompt]
+        for turn in turns:
+            messages += turn
+        return self.history.compact(messages)
+
+    def test_read_superseded_by_same_range_only(self):
+        messages = self.compact(
+            tool_turn(("get_file_content", {"file_path": "a.py"}, "old page 1")),
+            tool_turn(("get_file_content", {"file_path": "a.py", "offset": 100}, "page 2")),
+            tool_turn(("get_file_content", {"file_path": "a.py", "offset": 100, "length": 50}, "part of page 2")),
+            tool_turn(("get_file_content", {"file_path": "a.py", "offset": 0.0}, "new page 1")),
+        )
+        self.assertTrue(results(messages)[0].startswith(OMITTED_PREFIX))
+        self.assertEqual(results(messages)[1:], ["page 2", "part of page 2", "new page 1"])
+
+    def test_read_superseded_by_write_file_not_edit_file(self):
+        messages = self.compact(
+            tool_turn(("get_file_content", {"file_path": "a.py"}, "a")),
+            tool_turn(("get_file_content", {"file_path": "b.py"}, "b")),
+            tool_turn(
+                ("write_file", {"file_path": "a.py", "content": "A"}, 'Successfully wrote to "a.py"'),
+                ("edit_file", {"file_path": "b.py", "append": "B"}, 'Successfully appended to "b.py"'),
+            ),
+        )
+        self.assertTrue(results(messages)[0].startswith(OMITTED_PREFIX))
+        self.assertEqual(results(messages)[1], "b")
+
+    def test_failed_read_or_write_does_not_supersede(self):
+        messages = self.compact(
+            tool_turn(("get_file_content", {"file_path": "a.py"}, "a")),
+            tool_turn(("get_file_content", {"file_path": "b.py"}, "b")),
+            tool_turn(
+                ("get_file_content", {"file_path": "a.py"}, 'Error: File not found or is not a regular file: "a.py"'),
+                ("write_file", {"file_path": "b.py", "content": "B"}, "Error: Permission denied"),
+            ),
+        )
+        self.assertEqual(results(messages)[:2], ["a", "b"])
+
+    def test_duplicate_results(self):
+        messages = self.compact(
+            tool_turn(("get_files_info", {"directory": "."}, " - a.py")),
+            tool_turn(("get_files_info", {"directory": "pkg"}, " - a.py")),
+            tool_turn(("get_files_info", {"directory": "."}, " - a.py")),
+        )
+        self.assertEqual(
+            results(messages),
+            [f"{OMITTED_PREFIX} same result as a later get_files_info call]", " - a.py", " - a.py"],
+        )
+
+    def test_summary_cuts_at_a_model_turn(self):
+        self.history.token_budget = 0
+        messages = self.compact(
+            tool_turn(("get_files_info", {"directory": "."}, "listing")),
+            tool_turn(("get_file_content", {"file_path": "a.py"}, "a"), ("get_file_content", {"file_path": "b.py"}, "b")),
+            tool_turn(("search_files", {"query": "bug"}, "a.py:3: bug")),
+            tool_turn(("get_file_content", {"file_path": "c.py"}, "c")),
+        )
+        self.assertEqual([content.role for content in messages], ["user", "model", "tool", "model", "tool"])
+        # Every call kept is answered in the message right after it
+        for model, tool in zip(messages[1::2], messages[2::2]):
+            self.assertEqual(
+                [part.function_call.name for part in model.parts],
+                [part.function_response.name for part in tool.parts],
+            )
+        summary = messages[0].parts[1].text
+        self.assertEqual(messages[0].parts[0].text, "Fix the bug")
+        self.assertIn("- Called get_files_info(directory='.') -> listing", summary)
+        self.assertIn("- Called get_file_content(file_path='b.py') -> b", summary)
+        self.assertNotIn("search_files", summary)
+
+
+def prompt(text):
+    return [types.Content(role="user", parts=[types.Part(text=text)])]
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_reserve_waits_once_empty(self):
+        bucket = TokenBucket(per_minute=60)
+        self.assertEqual(bucket.reserve(60), 0)
+        # One token a second; the next caller waits for its token to be refilled
+        self.assertAlmostEqual(bucket.reserve(1), 1.0, delta=0.05)
+        self.assertAlmostEqual(bucket.reserve(1), 2.0, delta=0.05)
+
+    def test_adjust_gives_tokens_back(self):
+        bucket = TokenBucket(per_minute=60)
+        bucket.reserve(60)
+        bucket.adjust(-30)
+        self.assertEqual(bucket.reserve(30), 0)
+
+
+class TestScheduledClient(unittest.TestCase):
+    # Requests against a local fake of the API whose quota is 2 requests per 0.2 seconds
+
+    def start_server(self, **kwargs):
+        server = FakeGeminiServer(**{"requests_per_second": 2, "window_seconds": 0.2, "latency": 0, **kwargs})
+        server.start()
+        self.addCleanup(server.stop)
+        return server
+
+    def scheduled(self, server, **kwargs):
+        kwargs = {"fallback_models": (), "requests_per_minute": 60000, "base_delay": 0.01, "max_delay": 0.05, **kwargs}
+        return ScheduledClient(self.client(server), **kwargs)
+
+    def client(self, server):
+        client = create_client("fake-key", base_url=server.url)
+        self.addCleanup(client._api_client._httpx_client.close)
+        return client
+
+    def test_rate_limited_requests_are_retried(self):
+        server = self.start_server()
+        client = self.scheduled(server)
+        for index in range(5):
+            response = client.models.generate_content(model="gemini-test", contents=prompt(f"request {index}"))
+            self.assertEqual(response.text, "Done.")
+        self.assertGreater(server.counts["rate_limited"], 0)
+        self.assertEqual(client.stats["retries"], server.counts["rate_limited"])
+        self.assertEqual(server.counts["served"], 5)
+
+    def test_429_pauses_every_request_for_retry_after(self):
+        server = self.start_server(requests_per_second=1, window_seconds=0.5)
+        bare = self.client(server)
+        bare.models.generate_content(model="gemini-test", contents=prompt("fill the quota"))
+        with self.assertRaises(errors.APIError) as raised:
+            bare.models.generate_content(model="gemini-test", contents=prompt("over the quota"))
+        self.assertEqual(raised.exception.code, 429)
+
+        client = self.scheduled(server)
+        delay = client.retry_delay(raised.exception, "gemini-test", 0)
+        # Retry-After from the server, plus up to base_delay of jitter
+        self.assertGreater(delay, 0.3)
+        self.assertLessEqual(delay, 0.5 + client.base_delay)
+        # Other requests hold back too, although their buckets are full
+        self.assertGreater(client.reserve(1), 0.3)
+
+    def test_retries_give_up_after_max_retries(self):
+        server = self.start_server()
+        client = self.scheduled(server, max_retries=2)
+        error = errors.APIError(503, {"error": {"code": 503, "message": "Unavailable", "status": "UNAVAILABLE"}})
+        self.assertIsNot(client.retry_delay(error, "gemini-test", 1), NEXT_MODEL)
+        self.assertIs(client.retry_delay(error, "gemini-test", 2), NEXT_MODEL)
+        error = errors.APIError(400, {"error": {"code": 400, "message": "Bad request", "status": "INVALID_ARGUMENT"}})
+        self.assertIsNone(client.retry_delay(error, "gemini-test", 0))
+
+    def test_missing_model_falls_back(self):
+        server = self.start_server(missing_models=["gemini-missing"])
+        client = self.scheduled(server, fallback_models=("gemini-backup",))
+        for _ in range(2):
+            response = client.models.generate_content(model="gemini-missing", contents=prompt("hello"))
+            self.assertEqual(response.model_version, "gemini-backup")
+        # The second request skips the model known to be missing, but still counts as a fallback
+        self.assertEqual(server.counts["not_found"], 1)
+        self.assertEqual(client.stats["fallbacks"], 2)
+
+    def test_missing_model_without_fallback_raises(self):
+        server = self.start_server(missing_models=["gemini-missing"])
+        client = self.scheduled(server)
+        with self.assertRaises(errors.APIError) as raised:
+            client.models.generate_content(model="gemini-missing", contents=prompt("hello"))
+        self.assertEqual(raised.exception.code, 404)
+
+    def test_async_missing_model_falls_back(self):
+        server = self.start_server(missing_models=["gemini-missing"])
+        client = self.scheduled(server, fallback_models=("gemini-backup",))
+
+        async def generate():
+            try:
+                return await client.aio.models.generate_content(model="gemini-missing", contents=prompt("hello"))
+            finally:
+                await client._client._api_client._async_httpx_client.aclose()
+
+        response = asyncio.run(generate())
+        self.assertEqual(response.model_version, "gemini-backup")
+
+    def test_stream_retried_before_first_chunk(self):
+        server = self.start_server(requests_per_second=1)
+        client = self.scheduled(server)
+        client.models.generate_content(model="gemini-test", contents=prompt("fill the quota"))
+        start = time.monotonic()
+        chunks = list(client.models.generate_content_stream(model="gemini-test", contents=prompt("stream")))
+        self.assertEqual("".join(chunk.text for chunk in chunks), "Done.")
+        self.assertEqual(server.counts["rate_limited"], 1)
+        self.assertEqual(client.stats["retries"], 1)
+        self.assertLess(time.monotonic() - start, 1.0)
+
+
+class TestDispatch(unittest.TestCase):
+    def setUp(self):
+        self.events = []
+        self.lock = threading.Lock()
+        # Calls that must be running at the same time meet here
+        self.barrier = threading.Barrier(2, timeout=2)
+
+    def call_function(self, function_call_part, verbose):
+        args = function_call_part.args
+        label = f"{function_call_part.name}({args.get('file_path') or args.get('directory')})"
+        with self.lock:
+            self.events.append(f"start {label}")
+        if args.get("meet"):
+            self.barrier.wait()
+        time.sleep(args.get("sleep", 0))
+        with self.lock:
+            self.events.append(f"end {label}")
+        return label
+
+    def dispatch(self, *calls):
+        parts = [types.FunctionCall(name=name, args=args) for name, args in calls]
+        return dispatch_function_calls(parts, self.call_function)
+
+    def test_call_path_is_normalized(self):
+        def path(name, **args):
+            return _call_path(types.FunctionCall(name=name, args=args))
+
+        self.assertEqual(path("get_file_content", file_path="./a.py"), "a.py")
+        self.assertEqual(path("write_file", file_path="pkg/../a.py"), "a.py")
+        self.assertEqual(path("get_files_info", directory="pkg/"), "pkg")
+        self.assertEqual(path("get_files_info"), ".")
+        self.assertEqual(path("search_files", query="bug"), ".")
+        self.assertEqual(path("run_python_file", file_path="main.py"), ".")
+
+    def test_paths_overlap(self):
+        self.assertTrue(_paths_overlap("a.py", "a.py"))
+        self.assertTrue(_paths_overlap("pkg", os.path.join("pkg", "a.py")))
+        self.assertTrue(_paths_overlap(os.path.join("pkg", "a.py"), "pkg"))
+        self.assertTrue(_paths_overlap(".", "a.py"))
+        self.assertFalse(_paths_overlap("pkg", "pkg2"))
+        self.assertFalse(_paths_overlap("a.py", "b.py"))
+
+    def test_read_waits_for_earlier_write(self):
+        self.dispatch(
+            ("write_file", {"file_path": "a.py", "content": "x", "sleep": 0.1}),
+            ("get_file_content", {"file_path": "./a.py"}),
+        )
+        self.assertEqual(
+            self.events,
+            ["start write_file(a.py)", "end write_file(a.py)", "start get_file_content(./a.py)", "end get_file_content(./a.py)"],
+        )
+
+    def test_listing_waits_for_write_inside(self):
+        self.dispatch(
+            ("write_file", {"file_path": "pkg/a.py", "content": "x", "sleep": 0.1}),
+            ("get_files_info", {"directory": "pkg"}),
+        )
+        self.assertLess(self.events.index("end write_file(pkg/a.py)"), self.events.index("start get_files_info(pkg)"))
+
+    def test_write_waits_for_earlier_read(self):
+        self.dispatch(
+            ("get_file_content", {"file_path": "a.py", "sleep": 0.1}),
+            ("write_file", {"file_path": "a.py", "content": "x"}),
+        )
+        self.assertLess(self.events.index("end get_file_content(a.py)"), self.events.index("start write_file(a.py)"))
+
+    def test_overlapping_reads_run_together(self):
+        # Each waits at the barrier for the other, which fails unless they run at the same time
+        self.dispatch(
+            ("get_file_content", {"file_path": "a.py", "meet": True}),
+            ("get_file_content", {"file_path": "./a.py", "meet": True}),
+        )
+        self.assertEqual(len(self.events), 4)
+
+    def test_writes_to_different_files_run_together(self):
+        self.dispatch(
+            ("write_file", {"file_path": "a.py", "content": "x", "meet": True}),
+            ("write_file", {"file_path": "b.py", "content": "y", "meet": True}),
+        )
+        self.assertEqual(len(self.events), 4)
+
+    def test_results_in_call_order(self):
+        results = self.dispatch(
+            ("get_file_content", {"file_path": "slow.py", "sleep": 0.1}),
+            ("get_file_content", {"file_path": "fast.py"}),
+            ("write_file", {"file_path": "other.py", "content": "x"}),
+        )
+        self.assertEqual(results, ["get_file_content(slow.py)", "get_file_content(fast.py)", "write_file(other.py)"])
+        self.assertLess(self.events.index("end get_file_content(fast.py)"), self.events.index("end get_file_content(slow.py)"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,153 @@
+from google.genai import types
+from functions.get_files_info import schema_get_files_info, get_files_info
+from functions.get_file_content import schema_get_file_content, get_file_content
+from functions.write_file import schema_write_file, write_file
+from functions.edit_file import schema_edit_file, edit_file
+from functions.search_files import schema_search_files, search_files
+from functions.paths import sandbox_root
+import tracing
+from .config import WORKING_DIRECTORY
+
+try:
+    from functions.run_python import schema_run_python_file, run_python_file
+except ImportError:
+    # functions/run_python.py is not part of every checkout; the other tools work without it
+    run_python_file = None
+
+
+class ToolRegistry:
+    """
+    The functions the model can call, set up once per working directory.
+
+    The sandbox root is resolved when the registry is created, and each
+    tool is stored with what it needs injected, so a call only looks up
+    the tool and passes the model's arguments through.
+    """
+
+    def __init__(self, working_directory=WORKING_DIRECTORY):
+        self.root = sandbox_root(working_directory)
+        # name -> (function, whether it takes the session's FileReadCache)
+        self._tools = {}
+        self._schemas = []
+        self._declarations = None
+
+    def register(self, name, function, schema, cached=False):
+        """
+        Add a tool.
+
+        Args:
+            name: Name the model calls the tool by
+            function: Callable taking the working directory first, then the model's arguments
+            schema: Function declaration, as a plain dict or a types.FunctionDeclaration
+            cached: Whether the function takes the session's FileReadCache as cache=
+        """
+        self._tools[name] = (function, cached)
+        self._schemas.append(schema)
+        self._declarations = None
+
+    @property
+    def schemas(self):
+        return tuple(self._schemas)
+
+    def declarations(self):
+        """Return the tool declarations as an SDK types.Tool, built on first use."""
+        if self._declarations is None:
+            self._declarations = types.Tool(
+                function_declarations=[types.FunctionDeclaration.model_validate(schema) for schema in self._schemas]
+            )
+        return self._declarations
+
+    def call(self, function_call_part, verbose=False, read_cache=None):
+        """
+        Run the tool a function call names.
+
+        Args:
+            function_call_part: A types.FunctionCall with .name and .args properties
+            verbose: Whether to print detailed output
+            read_cache: Optional FileReadCache for the session making the call
+
+        Returns:
+            types.Content with the function result
+        """
+        function_name = function_call_part.name
+        function_args = function_call_part.args or {}
+
+        if verbose:
+            print(f"Calling function: {function_name}({dict(function_args)})")
+        else:
+            print(f" - Calling function: {function_name}")
+
+        tool = self._tools.get(function_name)
+        if tool is None:
+            return _function_response(function_name, {"error": f"Unknown function: {function_name}"})
+        function_to_call, cached = tool
+
+        try:
+            with tracing.span("tool", function=function_name) as span:
+                # The working directory is always ours, never the model's
+                if cached and read_cache is not None:
+                    function_result = function_to_call(self.root, **function_args, cache=read_cache)
+                else:
+                    function_result = function_to_call(self.root, **function_args)
+                span.set("result_chars", len(str(function_result)))
+            return _function_response(function_name, {"result": function_result})
+        except Exception as e:
+            return _function_response(function_name, {"error": f"Error executing function: {str(e)}"})
+
+
+def _function_response(function_name, response):
+    return types.Content(
+        role="tool",
+        parts=[types.Part.from_function_response(name=function_name, response=response)],
+    )
+
+
+registry = ToolRegistry()
+registry.register("get_files_info", get_files_info, schema_get_files_info)
+registry.register("get_file_content", get_file_content, schema_get_file_content, cached=True)
+if run_python_file is not None:
+    registry.register("run_python_file", run_python_file, schema_run_python_file)
+registry.register("write_file", write_file, schema_write_file, cached=True)
+registry.register("edit_file", edit_file, schema_edit_file, cached=True)
+registry.register("search_files", search_files, schema_search_files)
+
+
+def call_function(function_call_part, verbose=False, read_cache=None):
+    """
+    Handle calling one of our functions based on the LLM's function call.
+
+    Kept for existing callers; the work is done by the default registry.
+    
+    Args:
+        function_call_part: A types.FunctionCall with .name and .args properties
+        verbose: Whether to print detailed output
+        read_cache: Optional FileReadCache for the session making the call
+    
+    Returns:
+        types.Content with the function result
+    """
+    with tracing.span("call_function", function=function_call_part.name):
+        return registry.call(function_call_part, verbose, read_cache)
+
+# Only offered to the model when the tool is registered
+_run_python_line = "- Execute Python files with optional arguments\n" if run_python_file is not None else ""
+
+# System prompt for AI agent
+system_prompt = f"""
+You are a helpful AI coding agent.
+
+When a user asks a question or makes a request, make a function call plan. You can perform the following operations:
+
+- List files and directories
+- Read file contents, paging through large files with an offset
+{_run_python_line}- Write or overwrite files
+- Edit part of a file with search/replace pairs or a unified diff, or append to it
+- Search the contents of all files for a string
+
+All paths you provide should be relative to the working directory. You do not need to specify the working directory in your function calls as it is automatically injected for security reasons.
+"""
+
+
+def get_available_functions():
+    """Return the default registry's tool declarations as an SDK types.Tool."""
+    return registry.declarations()
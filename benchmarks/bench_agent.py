@@ -0,0 +1,93 @@
+"""
+Offline benchmark of the agent loop.
+
+Replays canned sessions from benchmarks/sessions against the calculator
+working directory through ReplayClient, so it needs neither network
+access nor an API key. Model latency is therefore zero and the numbers
+measure the loop itself: history handling, dispatch and the tools.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_agent [--repeat N]
+"""
+import io
+import os
+import sys
+import time
+import statistics
+import tracemalloc
+from contextlib import redirect_stdout
+import tracing
+from agent.replay import ReplayClient
+from agent.session import AgentSession
+
+SESSIONS_DIR = os.path.join(os.path.dirname(__file__), "sessions")
+
+# Canned session file name -> prompt the session was recorded with
+SESSIONS = {
+    "explore_calculator": "Explain how the calculator works",
+    "search_and_list": "Where is render defined and who uses it?",
+}
+
+
+def run_once(name, prompt):
+    """
+    Replay one canned session.
+
+    Returns:
+        Dictionary of measurements for this run
+    """
+    exporter = tracing.MemoryExporter()
+    tracing.configure(exporter)
+    client = ReplayClient(os.path.join(SESSIONS_DIR, f"{name}.jsonl"))
+    session = AgentSession(prompt)
+
+    tracemalloc.start()
+    start = time.perf_counter()
+    # The session prints every tool result; keep that out of the report
+    with redirect_stdout(io.StringIO()):
+        session.run(client)
+    wall_ms = (time.perf_counter() - start) * 1000
+    _, peak_bytes = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    tracing.configure(None)
+
+    tool_ms = sum(span.duration_ms for span in exporter.spans if span.name == "tool")
+    return {
+        "iterations": session.iteration,
+        "wall_ms": wall_ms,
+        "ms_per_iteration": wall_ms / max(session.iteration, 1),
+        "tool_ms": tool_ms,
+        "tool_calls": sum(1 for span in exporter.spans if span.name == "tool"),
+        "peak_kib": peak_bytes / 1024,
+    }
+
+
+def main():
+    repeat = 5
+    args = sys.argv[1:]
+    if "--repeat" in args:
+        repeat = int(args[args.index("--repeat") + 1])
+
+    if not os.path.isdir("calculator"):
+        print("Run from the repository root: python -m benchmarks.bench_agent")
+        sys.exit(1)
+
+    print(f"{'session':<22}{'iters':>6}{'calls':>6}{'wall ms':>10}{'ms/iter':>10}{'tool ms':>10}{'peak KiB':>10}")
+    for name, prompt in SESSIONS.items():
+        # The first run warms imports and the search index; report the median of the rest
+        run_once(name, prompt)
+        runs = [run_once(name, prompt) for _ in range(repeat)]
+
+        def median(key):
+            return statistics.median(run[key] for run in runs)
+
+        print(
+            f"{name:<22}{runs[0]['iterations']:>6}{runs[0]['tool_calls']:>6}"
+            f"{median('wall_ms'):>10.2f}{median('ms_per_iteration'):>10.2f}"
+            f"{median('tool_ms'):>10.2f}{median('peak_kib'):>10.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
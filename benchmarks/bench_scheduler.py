@@ -0,0 +1,64 @@
+"""
+Load test of the model request scheduler against a local fake Gemini server.
+
+Runs a burst of concurrent single-turn sessions through run_sessions,
+first with a bare client and then with ScheduledClient, against a fake
+server that answers 429 once its requests-per-second quota is used up.
+No network access or API key is needed.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_scheduler [--sessions N] [--quota RPS]
+"""
+import io
+import sys
+import time
+import asyncio
+from contextlib import redirect_stdout
+from agent.runtime import run_sessions
+from agent.scheduler import ScheduledClient, create_client
+from benchmarks.fake_gemini import FakeGeminiServer
+
+
+def run_burst(server, client, sessions):
+    """
+    Run one burst of sessions.
+
+    Returns:
+        Tuple of (completed sessions, wall seconds)
+    """
+    prompts = [f"Say done ({index})" for index in range(sessions)]
+    start = time.perf_counter()
+    with redirect_stdout(io.StringIO()):
+        finished = asyncio.run(run_sessions(prompts, client))
+    wall = time.perf_counter() - start
+    return sum(1 for session in finished if session.final_text), wall
+
+
+def main():
+    sessions = 60
+    quota = 20
+    args = sys.argv[1:]
+    if "--sessions" in args:
+        sessions = int(args[args.index("--sessions") + 1])
+    if "--quota" in args:
+        quota = int(args[args.index("--quota") + 1])
+
+    print(f"{'client':<12}{'completed':>10}{'wall s':>8}{'429s':>6}{'retries':>8}")
+    for label in ("bare", "scheduled"):
+        server = FakeGeminiServer(requests_per_second=quota).start()
+        client = create_client("fake-key", base_url=server.url)
+        scheduled = None
+        if label == "scheduled":
+            # Budget a little under the server's quota; retries cover the rest
+            client = scheduled = ScheduledClient(
+                client, fallback_models=(), requests_per_minute=quota * 60 * 0.9, base_delay=0.1
+            )
+        completed, wall = run_burst(server, client, sessions)
+        server.stop()
+        retries = scheduled.stats["retries"] if scheduled else 0
+        print(f"{label:<12}{f'{completed}/{sessions}':>10}{wall:>8.2f}{server.counts['rate_limited']:>6}{retries:>8}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,82 @@
+"""
+Startup benchmark.
+
+Times fresh interpreter processes doing the work a short, single-shot run
+pays for before its first model request: importing main, printing usage,
+importing the tool modules and building the SDK tool declarations. The
+bare interpreter start ("python -c pass") is reported as a baseline.
+
+Run from the repository root:
+
+    python -m benchmarks.bench_startup [--repeat N]
+"""
+import os
+import sys
+import time
+import statistics
+import subprocess
+
+# Label -> code run in a fresh interpreter
+CASES = {
+    "interpreter": "pass",
+    "import main": "import main",
+    "usage error": "import sys, main; sys.argv = ['main.py']; main.main()",
+    "tool modules": (
+        "import functions.get_files_info, functions.get_file_content, "
+        "functions.write_file, functions.search_files"
+    ),
+    "tool declarations": "from agent.tools import get_available_functions; get_available_functions()",
+}
+
+# main() exits with status 1 after printing the usage
+EXPECTED_EXIT = {"usage error": 1}
+
+
+class CaseFailed(Exception):
+    """A case exited with an error, so its time would mean nothing."""
+
+
+def time_case(code, expect_exit=0):
+    """Return the wall time of one fresh interpreter running code, in milliseconds."""
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.PIPE,
+        text=True,
+    )
+    elapsed = (time.perf_counter() - start) * 1000
+    if result.returncode != expect_exit:
+        lines = result.stderr.strip().splitlines()
+        raise CaseFailed(lines[-1] if lines else f"exit status {result.returncode}")
+    return elapsed
+
+
+def main():
+    repeat = 10
+    args = sys.argv[1:]
+    if "--repeat" in args:
+        repeat = int(args[args.index("--repeat") + 1])
+
+    if not os.path.isfile("main.py"):
+        print("Run from the repository root: python -m benchmarks.bench_startup")
+        sys.exit(1)
+
+    print(f"{'case':<22}{'median ms':>10}{'min ms':>10}")
+    failed = False
+    for label, code in CASES.items():
+        try:
+            # The first run fills the OS file cache and writes bytecode; leave it out
+            time_case(code, EXPECTED_EXIT.get(label, 0))
+            runs = [time_case(code, EXPECTED_EXIT.get(label, 0)) for _ in range(repeat)]
+        except CaseFailed as e:
+            print(f"{label:<22}{'failed':>10}  {e}")
+            failed = True
+            continue
+        print(f"{label:<22}{statistics.median(runs):>10.1f}{min(runs):>10.1f}")
+    if failed:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
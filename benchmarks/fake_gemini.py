@@ -0,0 +1,127 @@
+"""
+Local stand-in for the Gemini API, for exercising the request scheduler.
+
+Serves generateContent and streamGenerateContent for any model with a
+short text answer, after a fixed latency. It enforces its own requests-per-second quota and answers
+429 with a Retry-After header once that is exceeded, the way the real
+API does. Models listed as missing get 404. Everything else, e.g.
+context cache creation, gets 404 as well.
+
+    server = FakeGeminiServer(requests_per_second=20)
+    server.start()
+    client = create_client("fake-key", base_url=server.url)
+    ...
+    server.stop()
+"""
+import json
+import time
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+
+class _Handler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, headers=None):
+        payload = json.dumps(body).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        for name, value in (headers or {}).items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def do_POST(self):
+        fake = self.server.fake
+        body = self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        path = self.path.split("?", 1)[0]
+        stream = path.endswith(":streamGenerateContent")
+        if not (stream or path.endswith(":generateContent")) or "/models/" not in path:
+            self._send(404, {"error": {"code": 404, "message": "Not found", "status": "NOT_FOUND"}})
+            return
+
+        model = path.rsplit("/models/", 1)[1].split(":", 1)[0]
+        if model in fake.missing_models:
+            fake.count("not_found")
+            self._send(404, {"error": {"code": 404, "message": f"models/{model} is not found", "status": "NOT_FOUND"}})
+            return
+
+        retry_after = fake.admit()
+        if retry_after is not None:
+            fake.count("rate_limited")
+            self._send(
+                429,
+                {"error": {"code": 429, "message": "Resource has been exhausted", "status": "RESOURCE_EXHAUSTED"}},
+                {"Retry-After": f"{retry_after:.3f}"},
+            )
+            return
+
+        time.sleep(fake.latency)
+        fake.count("served")
+        prompt_tokens = max(1, len(body) // 4)
+        response = {
+            "candidates": [{"content": {"role": "model", "parts": [{"text": "Done."}]}, "finishReason": "STOP"}],
+            "usageMetadata": {"promptTokenCount": prompt_tokens, "candidatesTokenCount": 2, "totalTokenCount": prompt_tokens + 2},
+            "modelVersion": model,
+        }
+        if not stream:
+            self._send(200, response)
+            return
+
+        # Server-sent events, all in one chunk
+        payload = f"data: {json.dumps(response)}\r\n\r\n".encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+
+class FakeGeminiServer:
+    """A threaded HTTP server on localhost answering like the Gemini API."""
+
+    def __init__(self, requests_per_second=20, latency=0.05, missing_models=(), window_seconds=1.0):
+        # The quota is requests_per_second requests in any window_seconds; tests shorten the window
+        self.requests_per_second = requests_per_second
+        self.window_seconds = window_seconds
+        self.latency = latency
+        self.missing_models = set(missing_models)
+        self.counts = {"served": 0, "rate_limited": 0, "not_found": 0}
+        self._window = []
+        self._lock = threading.Lock()
+        self._server = ThreadingHTTPServer(("127.0.0.1", 0), _Handler)
+        self._server.daemon_threads = True
+        self._server.fake = self
+        # A short poll interval makes stop() quick, which adds up over many tests
+        self._thread = threading.Thread(target=self._server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True)
+
+    @property
+    def url(self):
+        host, port = self._server.server_address
+        return f"http://{host}:{port}"
+
+    def count(self, key):
+        with self._lock:
+            self.counts[key] += 1
+
+    def admit(self):
+        """Admit a request under the quota, or return the seconds until one would be."""
+        with self._lock:
+            now = time.monotonic()
+            self._window = [t for t in self._window if now - t < self.window_seconds]
+            if len(self._window) >= self.requests_per_second:
+                return self.window_seconds - (now - self._window[0])
+            self._window.append(now)
+            return None
+
+    def start(self):
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._server.shutdown()
+        self._server.server_close()
@@ -3,6 +3,7 @@
 import sys
 from pkg.calculator import Calculator
 from pkg.render import render
+from pkg.stream import FORMATS, stream
 
 
 def main():
@@ -10,9 +11,14 @@ def main():
     if len(sys.argv) <= 1:
         print("Calculator App")
         print('Usage: python main.py "<expression>"')
+        print("       python main.py --stream [--format plain|csv|jsonl] [--jobs N] [file]")
         print('Example: python main.py "3 + 5"')
+        print("Example: cat expressions.txt | python main.py --stream --format csv")
         return
 
+    if sys.argv[1] == "--stream":
+        sys.exit(run_stream(calculator, sys.argv[2:]))
+
     expression = " ".join(sys.argv[1:])
     try:
         result = calculator.evaluate(expression)
@@ -22,5 +28,43 @@ def main():
         print(f"Error: {e}")
 
 
+def run_stream(calculator, args):
+    output_format = "plain"
+    if "--format" in args:
+        index = args.index("--format")
+        if index + 1 >= len(args) or args[index + 1] not in FORMATS:
+            print(f"Error: --format must be one of {', '.join(FORMATS)}")
+            return 2
+        output_format = args[index + 1]
+        del args[index:index + 2]
+
+    jobs = 1
+    if "--jobs" in args:
+        index = args.index("--jobs")
+        try:
+            jobs = int(args[index + 1])
+        except (IndexError, ValueError):
+            jobs = 0
+        if jobs < 1:
+            print("Error: --jobs must be a positive number")
+            return 2
+        del args[index:index + 2]
+
+    # Flush every line when someone is typing, otherwise write in chunks
+    chunk_lines = 1 if sys.stdin.isatty() and not args else 1024
+    # An undecodable line becomes an invalid expression on that line instead of ending the stream
+    try:
+        if args:
+            with open(args[0], "r", encoding="utf-8", errors="replace") as file:
+                errors = stream(calculator, file, sys.stdout, output_format, chunk_lines, jobs)
+        else:
+            sys.stdin.reconfigure(errors="replace")
+            errors = stream(calculator, sys.stdin, sys.stdout, output_format, chunk_lines, jobs)
+    except OSError as e:
+        print(f"Error: {e}")
+        return 2
+    return 1 if errors else 0
+
+
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
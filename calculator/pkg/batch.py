@@ -0,0 +1,119 @@
+# batch.py
+
+import math
+import operator
+from array import array
+
+from .calculator import PUSH_CONST, PUSH_VAR, BINARY
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+SYMBOLS = {
+    operator.add: "+",
+    operator.sub: "-",
+    operator.mul: "*",
+    operator.truediv: "/",
+}
+
+
+def _divide(a, b):
+    # Division as numpy does it: a zero divisor gives inf or nan for that row only
+    try:
+        return a / b
+    except ZeroDivisionError:
+        if a != a or a == 0:
+            return math.nan
+        return math.copysign(math.inf, a) * math.copysign(1.0, b)
+
+
+def column_length(columns):
+    lengths = {len(column) for column in columns.values()}
+    if len(lengths) > 1:
+        raise ValueError("columns must all have the same length")
+    return lengths.pop() if lengths else 1
+
+
+def evaluate_batch(calculator, expression, columns, use_numpy=None):
+    return evaluate_columns(calculator.compile(expression), columns, use_numpy)
+
+
+def evaluate_columns(program, columns, use_numpy=None):
+    if use_numpy is None:
+        use_numpy = np is not None
+    missing = program.variables - columns.keys()
+    if missing:
+        raise ValueError(f"unbound variable: {sorted(missing)[0]}")
+    length = column_length(columns)
+    if use_numpy:
+        return _evaluate_numpy(program, columns, length)
+    return _evaluate_rows(program, columns, length)
+
+
+def _evaluate_numpy(program, columns, length):
+    # The same postfix program works on whole arrays: every operator is elementwise
+    arrays = {name: np.asarray(columns[name], dtype=np.float64) for name in program.variables}
+    stack = []
+    push = stack.append
+    pop = stack.pop
+    # Division by zero gives inf or nan per row instead of failing the whole column
+    with np.errstate(divide="ignore", invalid="ignore"):
+        for opcode, arg in program.instructions:
+            if opcode == PUSH_CONST:
+                # A numpy scalar, so a constant divisor of zero also gives inf or nan
+                push(np.float64(arg))
+            elif opcode == PUSH_VAR:
+                push(arrays[arg])
+            elif opcode == BINARY:
+                b = pop()
+                push(arg(pop(), b))
+            else:
+                push(-pop())
+    return np.broadcast_to(np.asarray(stack[0], dtype=np.float64), (length,)).copy()
+
+
+def _evaluate_rows(program, columns, length):
+    # Without numpy, turn the program into one Python function and map it over the rows.
+    # Constants and the division helper are bound as default arguments, never written
+    # into the source, so values such as inf and nan need no literal.
+    names = sorted(program.variables)
+    params = {name: f"v{index}" for index, name in enumerate(names)}
+    bound = {"divide": _divide}
+    stack = []
+    for opcode, arg in program.instructions:
+        if opcode == PUSH_CONST:
+            constant = f"c{len(bound) - 1}"
+            bound[constant] = arg
+            stack.append(constant)
+        elif opcode == PUSH_VAR:
+            stack.append(params[arg])
+        elif opcode == BINARY:
+            b = stack.pop()
+            a = stack.pop()
+            stack.append(f"divide({a}, {b})" if arg is operator.truediv else f"({a} {SYMBOLS[arg]} {b})")
+        else:
+            stack.append(f"(-{stack.pop()})")
+
+    signature = [params[name] for name in names] + [f"{key}={key}" for key in bound]
+    function = eval(f"lambda {', '.join(signature)}: {stack[0]}", {"__builtins__": {}, **bound})
+    if not names:
+        return array("d", [function()] * length)
+    return array("d", map(function, *(columns[name] for name in names)))
+
+
+def evaluate_many(calculator, lines, start=1):
+    for line_number, line in enumerate(lines, start=start):
+        expression = line.strip()
+        if not expression:
+            continue
+        try:
+            yield line_number, expression, calculator.evaluate(expression), None
+        except Exception as e:
+            yield line_number, expression, None, e
+
+
+def evaluate_file(calculator, path):
+    with open(path, "r", encoding="utf-8", errors="replace") as file:
+        yield from evaluate_many(calculator, file)
@@ -1,61 +1,192 @@
 # calculator.py
 
+import operator
+import re
+from collections import OrderedDict
+
+# Numbers are written as float() reads them: digits may be grouped with underscores
+DIGITS = r"\d(?:_?\d)*"
+TOKEN_PATTERN = re.compile(
+    rf"\s*(?:((?:{DIGITS}(?:\.(?:{DIGITS})?)?|\.{DIGITS})(?:[eE][+-]?{DIGITS})?)|([A-Za-z_]\w*)|(\S))"
+)
+
+# Names float() reads as numbers; they are constants, not variables
+FLOAT_NAMES = frozenset({"inf", "infinity", "nan"})
+
+# Instructions of a compiled program
+PUSH_CONST = 0
+PUSH_VAR = 1
+BINARY = 2
+NEGATE = 3
+
+UNARY_MINUS = "neg"
+
+# A "+" written directly before a number or name, as in "+5"; a sign there, addition elsewhere
+SIGN_PLUS = "pos"
+
+
+def _starts_operand(expression, index):
+    next_char = expression[index:index + 1]
+    return next_char.isalnum() or next_char in ("_", ".")
+
+
+class Program:
+    # An expression compiled to postfix instructions, evaluated with a value stack
+
+    def __init__(self, expression, instructions, variables):
+        self.expression = expression
+        self.instructions = instructions
+        self.variables = variables
+        self.constant = None
+        if not variables:
+            try:
+                self.constant = self.evaluate()
+            except ArithmeticError:
+                # Leave the error to be raised when the program is evaluated
+                pass
+
+    def evaluate(self, variables=None):
+        if self.constant is not None:
+            return self.constant
+
+        stack = []
+        push = stack.append
+        pop = stack.pop
+        for opcode, arg in self.instructions:
+            if opcode == PUSH_CONST:
+                push(arg)
+            elif opcode == PUSH_VAR:
+                try:
+                    push(variables[arg])
+                except (KeyError, TypeError):
+                    raise ValueError(f"unbound variable: {arg}")
+            elif opcode == BINARY:
+                b = pop()
+                push(arg(pop(), b))
+            else:
+                push(-pop())
+        return stack[0]
+
+    def __call__(self, variables=None):
+        return self.evaluate(variables)
+
+
 class Calculator:
-    def __init__(self):
+    def __init__(self, cache_size=256):
         self.operators = {
-            "+": lambda a, b: a + b,
-            "-": lambda a, b: a - b,
-            "*": lambda a, b: a * b,
-            "/": lambda a, b: a / b,
+            "+": operator.add,
+            "-": operator.sub,
+            "*": operator.mul,
+            "/": operator.truediv,
         }
         self.precedence = {
             "+": 1,
             "-": 1,
             "*": 2,
             "/": 2,
+            UNARY_MINUS: 3,
         }
+        self.cache_size = cache_size
+        self._programs = OrderedDict()
 
-    def evaluate(self, expression):
+    def evaluate(self, expression, variables=None):
         if not expression or expression.isspace():
             return None
-        tokens = expression.strip().split()
-        return self._evaluate_infix(tokens)
+        return self.compile(expression).evaluate(variables)
+
+    def compile(self, expression):
+        program = self._programs.get(expression)
+        if program is not None:
+            self._programs.move_to_end(expression)
+            return program
+
+        program = self._compile(expression)
+        self._programs[expression] = program
+        if len(self._programs) > self.cache_size:
+            self._programs.popitem(last=False)
+        return program
 
-    def _evaluate_infix(self, tokens):
-        values = []
+    def _tokenize(self, expression):
+        tokens = []
+        expression = expression.strip()
+        for match in TOKEN_PATTERN.finditer(expression):
+            number, name, symbol = match.groups()
+            if number:
+                tokens.append((PUSH_CONST, float(number)))
+            elif name and name.lower() in FLOAT_NAMES:
+                tokens.append((PUSH_CONST, float(name)))
+            elif name:
+                tokens.append((PUSH_VAR, name))
+            elif symbol == "+" and _starts_operand(expression, match.end()):
+                tokens.append((None, SIGN_PLUS))
+            elif symbol in self.operators or symbol in "()":
+                tokens.append((None, symbol))
+            else:
+                raise ValueError(f"invalid token: {symbol}")
+        return tokens
+
+    def _compile(self, expression):
+        # Shunting-yard to postfix, tracking stack depth so bad expressions fail here
+        instructions = []
+        variables = set()
         operators = []
+        depth = 0
+        expect_operand = True
+
+        def emit(op):
+            nonlocal depth
+            if op == UNARY_MINUS:
+                if depth < 1:
+                    raise ValueError("not enough operands for operator -")
+                instructions.append((NEGATE, None))
+            else:
+                if depth < 2:
+                    raise ValueError(f"not enough operands for operator {op}")
+                instructions.append((BINARY, self.operators[op]))
+                depth -= 1
 
-        for token in tokens:
-            if token in self.operators:
+        for kind, value in self._tokenize(expression):
+            if value == SIGN_PLUS and not expect_operand:
+                value = "+"
+            if kind is not None:
+                instructions.append((kind, value))
+                if kind == PUSH_VAR:
+                    variables.add(value)
+                depth += 1
+                expect_operand = False
+            elif value == "(":
+                operators.append(value)
+                expect_operand = True
+            elif value == ")":
+                while operators and operators[-1] != "(":
+                    emit(operators.pop())
+                if not operators:
+                    raise ValueError("mismatched parentheses")
+                operators.pop()
+                expect_operand = False
+            elif value == "-" and expect_operand:
+                operators.append(UNARY_MINUS)
+            elif value == SIGN_PLUS and expect_operand:
+                # float() accepted "+5"; the sign changes nothing
+                continue
+            else:
+                # Unary minus binds tighter than everything and is right-associative
                 while (
                     operators
-                    and operators[-1] in self.operators
-                    and self.precedence[operators[-1]] >= self.precedence[token]
+                    and operators[-1] != "("
+                    and self.precedence[operators[-1]] >= self.precedence[value]
                 ):
-                    self._apply_operator(operators, values)
-                operators.append(token)
-            else:
-                try:
-                    values.append(float(token))
-                except ValueError:
-                    raise ValueError(f"invalid token: {token}")
+                    emit(operators.pop())
+                operators.append(value)
+                expect_operand = True
 
         while operators:
-            self._apply_operator(operators, values)
+            op = operators.pop()
+            if op == "(":
+                raise ValueError("mismatched parentheses")
+            emit(op)
 
-        if len(values) != 1:
+        if depth != 1:
             raise ValueError("invalid expression")
 
-        return values[0]
-
-    def _apply_operator(self, operators, values):
-        if not operators:
-            return
-
-        operator = operators.pop()
-        if len(values) < 2:
-            raise ValueError(f"not enough operands for operator {operator}")
-
-        b = values.pop()
-        a = values.pop()
-        values.append(self.operators[operator](a, b))
\ No newline at end of file
+        return Program(expression, tuple(instructions), frozenset(variables))
@@ -0,0 +1,127 @@
+# parallel.py
+
+import os
+from array import array
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from itertools import chain, islice
+from multiprocessing import shared_memory
+
+from .batch import column_length, evaluate_columns, evaluate_many
+from .calculator import Calculator
+
+# Lines per task; large enough that pickling a chunk costs little next to evaluating it
+CHUNK_SIZE = 2000
+
+# Rows per task when splitting columns
+MIN_ROWS_PER_TASK = 10000
+
+_calculator = None
+
+
+def _init_worker():
+    # One Calculator per process, so its compiled-program cache lives across chunks
+    global _calculator
+    _calculator = Calculator()
+
+
+def _evaluate_chunk(start, lines):
+    return list(evaluate_many(_calculator, lines, start=start))
+
+
+def default_jobs():
+    return os.cpu_count() or 1
+
+
+def _chunks(lines, chunk_size):
+    iterator = iter(lines)
+    start = 1
+    while True:
+        chunk = list(islice(iterator, chunk_size))
+        if not chunk:
+            return
+        yield start, chunk
+        start += len(chunk)
+
+
+def evaluate_many_parallel(lines, jobs=None, chunk_size=CHUNK_SIZE):
+    # Same results as batch.evaluate_many, in input order, spread over a process pool
+    jobs = jobs or default_jobs()
+    chunks = _chunks(lines, chunk_size)
+    first = list(islice(chunks, 2))
+    if jobs == 1 or len(first) < 2:
+        # Too little work to pay for starting the pool
+        calculator = Calculator()
+        for start, chunk in chain(first, chunks):
+            yield from evaluate_many(calculator, chunk, start=start)
+        return
+
+    with ProcessPoolExecutor(max_workers=jobs, initializer=_init_worker) as executor:
+        # Keep a bounded number of chunks in flight so input is read as it is consumed
+        pending = deque()
+        for start, chunk in chain(first, chunks):
+            pending.append(executor.submit(_evaluate_chunk, start, chunk))
+            if len(pending) >= jobs * 2:
+                yield from pending.popleft().result()
+        while pending:
+            yield from pending.popleft().result()
+
+
+def _evaluate_slice(expression, names, out_name, start, stop):
+    blocks = [shared_memory.SharedMemory(name=name) for name in names.values()] + [
+        shared_memory.SharedMemory(name=out_name)
+    ]
+    views = [block.buf.cast("d") for block in blocks]
+    try:
+        columns = {variable: view[start:stop] for variable, view in zip(names, views)}
+        result = evaluate_columns(_calculator.compile(expression), columns)
+        views[-1][start:stop] = result
+        del columns
+    finally:
+        for view in views:
+            view.release()
+        for block in blocks:
+            block.close()
+
+
+def evaluate_batch_parallel(calculator, expression, columns, jobs=None, min_rows=MIN_ROWS_PER_TASK):
+    # Like batch.evaluate_batch, with columns passed to the workers in shared memory
+    program = calculator.compile(expression)
+    jobs = jobs or default_jobs()
+    length = column_length(columns)
+    tasks = min(jobs, length // min_rows)
+    if tasks <= 1:
+        return evaluate_columns(program, columns)
+    missing = program.variables - columns.keys()
+    if missing:
+        raise ValueError(f"unbound variable: {sorted(missing)[0]}")
+
+    blocks = {}
+    try:
+        for variable in program.variables:
+            block = shared_memory.SharedMemory(create=True, size=length * 8)
+            blocks[variable] = block
+            view = block.buf.cast("d")
+            view[:] = array("d", columns[variable])
+            view.release()
+        out = shared_memory.SharedMemory(create=True, size=length * 8)
+        blocks[None] = out
+
+        names = {variable: blocks[variable].name for variable in program.variables}
+        bounds = [length * index // tasks for index in range(tasks + 1)]
+        with ProcessPoolExecutor(max_workers=tasks, initializer=_init_worker) as executor:
+            futures = [
+                executor.submit(_evaluate_slice, expression, names, out.name, start, stop)
+                for start, stop in zip(bounds, bounds[1:])
+            ]
+            for future in futures:
+                future.result()
+
+        view = out.buf.cast("d")
+        result = array("d", view)
+        view.release()
+        return result
+    finally:
+        for block in blocks.values():
+            block.close()
+            block.unlink()
@@ -1,23 +1,65 @@
 # render.py
 
-def render(expression, result):
+from functools import lru_cache
+
+RENDER_FORMATS = ("box", "plain", "table")
+
+
+def format_result(result):
     if isinstance(result, float) and result.is_integer():
-        result_str = str(int(result))
-    else:
-        result_str = str(result)
+        return str(int(result))
+    return str(result)
 
-    box_width = max(len(expression), len(result_str)) + 4
 
-    box = []
-    box.append("┌" + "─" * box_width + "┐")
-    box.append(
-        "│" + " " * 2 + expression + " " * (box_width - len(expression) - 2) + "│"
-    )
-    box.append("│" + " " * box_width + "│")
-    box.append("│" + " " * 2 + "=" + " " * (box_width - 3) + "│")
-    box.append("│" + " " * box_width + "│")
-    box.append(
-        "│" + " " * 2 + result_str + " " * (box_width - len(result_str) - 2) + "│"
+@lru_cache(maxsize=128)
+def _box_template(box_width):
+    # Everything in a box except the two content lines depends only on its width
+    top = "┌" + "─" * box_width + "┐\n"
+    middle = "│" + " " * box_width + "│\n│  =" + " " * (box_width - 3) + "│\n│" + " " * box_width + "│\n"
+    bottom = "└" + "─" * box_width + "┘"
+    return top, middle, bottom
+
+
+def _render_box(expression, result_str, pieces):
+    box_width = max(len(expression), len(result_str)) + 4
+    top, middle, bottom = _box_template(box_width)
+    pieces += (
+        top,
+        "│  ", expression, " " * (box_width - len(expression) - 2), "│\n",
+        middle,
+        "│  ", result_str, " " * (box_width - len(result_str) - 2), "│\n",
+        bottom,
     )
-    box.append("└" + "─" * box_width + "┘")
-    return "\n".join(box)
\ No newline at end of file
+
+
+def render(expression, result):
+    pieces = []
+    _render_box(expression, format_result(result), pieces)
+    return "".join(pieces)
+
+
+def render_many(items, out=None, output_format="box"):
+    # Render (expression, result) pairs into one string and hand it over in a single write
+    items = [(expression, format_result(result)) for expression, result in items]
+    pieces = []
+    if output_format == "box":
+        for expression, result_str in items:
+            _render_box(expression, result_str, pieces)
+            pieces.append("\n")
+    elif output_format == "plain":
+        for expression, result_str in items:
+            pieces += (expression, " = ", result_str, "\n")
+    elif output_format == "table":
+        # Column widths are computed once for the whole table
+        width = max((len(expression) for expression, _ in items), default=0)
+        result_width = max((len(result_str) for _, result_str in items), default=0)
+        for expression, result_str in items:
+            pieces += (expression.ljust(width), " │ ", result_str.rjust(result_width), "\n")
+    else:
+        raise ValueError(f"unknown format: {output_format}")
+
+    text = "".join(pieces)
+    if out is None:
+        return text
+    out.write(text)
+    return None
@@ -0,0 +1,80 @@
+# stream.py
+
+import csv
+import io
+import json
+import math
+
+from .batch import evaluate_many
+from .parallel import evaluate_many_parallel
+from .render import format_result
+
+FORMATS = ("plain", "csv", "jsonl")
+
+# Lines of output collected before each write
+CHUNK_LINES = 1024
+
+
+def format_plain(line_number, expression, result, error):
+    if error is not None:
+        return f"Error: line {line_number}: {error}\n"
+    return format_result(result) + "\n"
+
+
+def format_jsonl(line_number, expression, result, error):
+    record = {"line": line_number, "expression": expression}
+    if error is not None:
+        record["error"] = str(error)
+    elif math.isfinite(result):
+        record["result"] = result
+    else:
+        # JSON has no inf or nan; write them as the strings float() reads back
+        record["result"] = str(result)
+    return json.dumps(record, allow_nan=False) + "\n"
+
+
+def make_csv_formatter():
+    buffer = io.StringIO()
+    writer = csv.writer(buffer, lineterminator="\n")
+
+    def format_csv(line_number, expression, result, error):
+        buffer.seek(0)
+        buffer.truncate()
+        if error is not None:
+            writer.writerow([line_number, expression, "", error])
+        else:
+            writer.writerow([line_number, expression, format_result(result), ""])
+        return buffer.getvalue()
+
+    return format_csv
+
+
+def stream(calculator, lines, out, output_format="plain", chunk_lines=CHUNK_LINES, jobs=1):
+    if output_format == "plain":
+        formatter = format_plain
+    elif output_format == "jsonl":
+        formatter = format_jsonl
+    elif output_format == "csv":
+        formatter = make_csv_formatter()
+        out.write("line,expression,result,error\n")
+    else:
+        raise ValueError(f"unknown format: {output_format}")
+
+    if jobs == 1:
+        results = evaluate_many(calculator, lines)
+    else:
+        results = evaluate_many_parallel(lines, jobs)
+
+    errors = 0
+    chunk = []
+    for line_number, expression, result, error in results:
+        if error is not None:
+            errors += 1
+        chunk.append(formatter(line_number, expression, result, error))
+        if len(chunk) >= chunk_lines:
+            out.write("".join(chunk))
+            out.flush()
+            chunk.clear()
+    out.write("".join(chunk))
+    out.flush()
+    return errors
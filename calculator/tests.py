@@ -1,7 +1,15 @@
 # tests.py
 
+import io
+import os
+import json
+import tempfile
 import unittest
+from array import array
 from pkg.calculator import Calculator
+from pkg.render import render, render_many
+from pkg import batch, parallel
+from pkg.stream import stream
 
 
 class TestCalculator(unittest.TestCase):
@@ -44,6 +52,193 @@ class TestCalculator(unittest.TestCase):
         with self.assertRaises(ValueError):
             self.calculator.evaluate("+ 3")
 
+    def test_parentheses(self):
+        result = self.calculator.evaluate("(3 + 5) * 2")
+        self.assertEqual(result, 16)
+
+    def test_mismatched_parentheses(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("(3 + 5")
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("3 + 5)")
+
+    def test_unary_minus(self):
+        self.assertEqual(self.calculator.evaluate("-3 + 5"), 2)
+        self.assertEqual(self.calculator.evaluate("2 * -(1 + 2)"), -6)
+
+    def test_unary_plus(self):
+        self.assertEqual(self.calculator.evaluate("+3 * +5"), 15)
+        self.assertEqual(self.calculator.evaluate("2++.5"), 2.5)
+
+    def test_numbers_float_accepts(self):
+        # Every number form float() reads, as the calculator did before it had a tokenizer
+        self.assertEqual(self.calculator.evaluate("1_000 + 2.5e1_0"), 1000 + 2.5e10)
+        self.assertEqual(self.calculator.evaluate("1. + .5 + 1E-1"), 1.6)
+        self.assertEqual(self.calculator.evaluate("inf"), float("inf"))
+        self.assertEqual(self.calculator.evaluate("-Infinity * 2"), float("-inf"))
+        result = self.calculator.evaluate("NaN + 1")
+        self.assertNotEqual(result, result)
+
+    def test_without_spaces(self):
+        result = self.calculator.evaluate("2*3-8/2+5")
+        self.assertEqual(result, 7)
+
+    def test_variables(self):
+        result = self.calculator.evaluate("x * 2 + y", {"x": 3, "y": 1})
+        self.assertEqual(result, 7)
+
+    def test_unbound_variable(self):
+        with self.assertRaises(ValueError):
+            self.calculator.evaluate("x + 1")
+
+    def test_compiled_program_is_cached(self):
+        program = self.calculator.compile("a / b")
+        self.assertIs(self.calculator.compile("a / b"), program)
+        self.assertEqual(program.evaluate({"a": 10, "b": 4}), 2.5)
+        self.assertEqual(program.evaluate({"a": 1, "b": 2}), 0.5)
+
+    def test_cache_is_bounded(self):
+        calculator = Calculator(cache_size=2)
+        first = calculator.compile("1 + 1")
+        calculator.compile("2 + 2")
+        calculator.compile("3 + 3")
+        self.assertIsNot(calculator.compile("1 + 1"), first)
+
+    def test_division_by_zero(self):
+        with self.assertRaises(ZeroDivisionError):
+            self.calculator.evaluate("1 / 0")
+
+
+class TestBatch(unittest.TestCase):
+    def setUp(self):
+        self.calculator = Calculator()
+        self.columns = {"x": array("d", [1, 2, 3]), "y": [10, 20, 30]}
+
+    def test_evaluate_batch_rows(self):
+        result = batch.evaluate_batch(self.calculator, "x * 2 + y", self.columns, use_numpy=False)
+        self.assertEqual(list(result), [12, 24, 36])
+
+    @unittest.skipIf(batch.np is None, "numpy is not installed")
+    def test_evaluate_batch_numpy(self):
+        result = batch.evaluate_batch(self.calculator, "-(x - y) / 2", self.columns, use_numpy=True)
+        self.assertEqual(list(result), [4.5, 9, 13.5])
+
+    def test_rows_divide_by_zero_per_row(self):
+        columns = {"x": [1, 0, -2, 4], "y": [0, 0, 0, 2]}
+        result = list(batch.evaluate_batch(self.calculator, "x / y", columns, use_numpy=False))
+        self.assertEqual(result[0], float("inf"))
+        self.assertNotEqual(result[1], result[1])
+        self.assertEqual(result[2:], [float("-inf"), 2])
+
+    def test_constant_divisor_of_zero_matches_across_paths(self):
+        paths = [False] if batch.np is None else [False, True]
+        for use_numpy in paths:
+            with self.subTest(use_numpy=use_numpy):
+                result = batch.evaluate_batch(self.calculator, "x * (1 / 0) - 0 / 0 * 0", self.columns, use_numpy)
+                self.assertTrue(all(value != value for value in result))
+                result = batch.evaluate_batch(self.calculator, "x * (1 / 0)", self.columns, use_numpy)
+                self.assertEqual(list(result), [float("inf")] * 3)
+
+    def test_rows_non_finite_constant(self):
+        result = batch.evaluate_batch(self.calculator, "x + 1e999", self.columns, use_numpy=False)
+        self.assertEqual(list(result), [float("inf")] * 3)
+
+    def test_constant_expression_fills_column(self):
+        result = batch.evaluate_batch(self.calculator, "1 + 1", self.columns)
+        self.assertEqual(list(result), [2, 2, 2])
+
+    def test_mismatched_columns(self):
+        with self.assertRaises(ValueError):
+            batch.evaluate_batch(self.calculator, "x + y", {"x": [1, 2], "y": [1]})
+
+    def test_unbound_column(self):
+        with self.assertRaises(ValueError):
+            batch.evaluate_batch(self.calculator, "x + z", self.columns)
+
+    def test_evaluate_many(self):
+        results = list(batch.evaluate_many(self.calculator, ["3 + 5", "", "$ 1", "2 * 3"]))
+        self.assertEqual([(line, result) for line, _, result, _ in results], [(1, 8), (3, None), (4, 6)])
+        self.assertIsInstance(results[1][3], ValueError)
+
+
+class TestStream(unittest.TestCase):
+    def setUp(self):
+        self.calculator = Calculator()
+        self.lines = ["3 + 5\n", "\n", "1 / 0\n", "7 / 2\n"]
+
+    def run_stream(self, output_format):
+        out = io.StringIO()
+        errors = stream(self.calculator, self.lines, out, output_format, chunk_lines=2)
+        return errors, out.getvalue()
+
+    def test_plain(self):
+        errors, output = self.run_stream("plain")
+        self.assertEqual(errors, 1)
+        self.assertEqual(output, "8\nError: line 3: float division by zero\n3.5\n")
+
+    def test_csv(self):
+        _, output = self.run_stream("csv")
+        self.assertEqual(
+            output.splitlines(),
+            ["line,expression,result,error", "1,3 + 5,8,", "3,1 / 0,,float division by zero", "4,7 / 2,3.5,"],
+        )
+
+    def test_jsonl(self):
+        _, output = self.run_stream("jsonl")
+        records = [json.loads(line) for line in output.splitlines()]
+        self.assertEqual(records[0], {"line": 1, "expression": "3 + 5", "result": 8.0})
+        self.assertEqual(records[1]["error"], "float division by zero")
+        self.assertEqual(len(records), 3)
+
+    def test_jsonl_non_finite(self):
+        out = io.StringIO()
+        stream(self.calculator, ["1e999\n", "1e999 - 1e999\n"], out, "jsonl")
+        records = [json.loads(line, parse_constant=self.fail) for line in out.getvalue().splitlines()]
+        self.assertEqual([record["result"] for record in records], ["inf", "nan"])
+
+    def test_undecodable_line(self):
+        with tempfile.NamedTemporaryFile("wb", suffix=".txt", delete=False) as file:
+            file.write(b"1 + 1\n2 \xff 3\n4 * 2\n")
+        self.addCleanup(os.remove, file.name)
+        results = list(batch.evaluate_file(self.calculator, file.name))
+        self.assertEqual([(line, result) for line, _, result, _ in results], [(1, 2), (2, None), (3, 8)])
+
+
+class TestParallel(unittest.TestCase):
+    def test_evaluate_many_parallel_keeps_order(self):
+        lines = [f"{i} * 2" for i in range(50)] + ["1 / 0"]
+        results = list(parallel.evaluate_many_parallel(lines, jobs=2, chunk_size=7))
+        self.assertEqual([line for line, _, _, _ in results], list(range(1, 52)))
+        self.assertEqual(results[10][2], 20)
+        self.assertIsInstance(results[-1][3], ZeroDivisionError)
+
+    def test_evaluate_batch_parallel(self):
+        calculator = Calculator()
+        columns = {"x": array("d", range(1000)), "y": list(range(1000))}
+        result = parallel.evaluate_batch_parallel(calculator, "x * 2 - y", columns, jobs=2, min_rows=100)
+        self.assertEqual(list(result), list(range(1000)))
+
+
+class TestRender(unittest.TestCase):
+    def test_render_box(self):
+        self.assertEqual(
+            render("3 + 5", 8.0),
+            "┌─────────┐\n│  3 + 5  │\n│         │\n│  =      │\n│         │\n│  8      │\n└─────────┘",
+        )
+
+    def test_render_many_box_matches_render(self):
+        items = [("3 + 5", 8.0), ("10 / 4", 2.5)]
+        expected = "".join(render(expression, result) + "\n" for expression, result in items)
+        self.assertEqual(render_many(items), expected)
+
+    def test_render_many_table_writes_once(self):
+        out = io.StringIO()
+        render_many([("3 + 5", 8.0), ("10 / 4", 2.5)], out, "table")
+        self.assertEqual(out.getvalue(), "3 + 5  │   8\n10 / 4 │ 2.5\n")
+
+    def test_render_many_plain(self):
+        self.assertEqual(render_many([("2 * 3", 6.0)], output_format="plain"), "2 * 3 = 6\n")
+
 
 if __name__ == "__main__":
     unittest.main()
\ No newline at end of file
@@ -0,0 +1,51 @@
+import os
+import secrets
+from contextlib import contextmanager
+
+
+def _create_temp_file(directory, name):
+    """Create a new, uniquely named file in directory and return (fd, path)."""
+    while True:
+        temp_path = os.path.join(directory, f".{name}.{secrets.token_hex(4)}.tmp")
+        try:
+            # Unlike mkstemp's 0o600, 0o666 lets the process umask give a new file the usual mode
+            return os.open(temp_path, os.O_CREAT | os.O_EXCL | os.O_WRONLY, 0o666), temp_path
+        except FileExistsError:
+            continue
+
+
+@contextmanager
+def atomic_write(abs_path, encoding='utf-8'):
+    """
+    Open a temporary file next to abs_path and move it into place on success.
+
+    The temporary file is renamed over abs_path with os.replace, so readers
+    see either the old file or the new one, never a partial write. If the
+    block raises, the temporary file is removed and abs_path is untouched.
+    An existing file's permission bits are kept.
+
+    Args:
+        abs_path: Absolute path of the file to write
+        encoding: Text encoding of the file
+
+    Yields:
+        Text file object to write the new content to
+    """
+    directory, name = os.path.split(abs_path)
+    fd, temp_path = _create_temp_file(directory, name)
+    try:
+        with os.fdopen(fd, 'w', encoding=encoding, newline='') as file:
+            yield file
+            file.flush()
+            os.fsync(file.fileno())
+        try:
+            os.chmod(temp_path, os.stat(abs_path).st_mode & 0o7777)
+        except FileNotFoundError:
+            pass
+        os.replace(temp_path, abs_path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except FileNotFoundError:
+            pass
+        raise
@@ -1,2 +1,22 @@
+import os
+
 # Configuration constants for file operations
 MAX_FILE_SIZE_CHARS = 10000
+
+# Memory budget for the per-session file read cache
+FILE_CACHE_MAX_BYTES = 32 * 1024 * 1024
+
+# Maximum number of entries returned by one get_files_info call
+MAX_LIST_ENTRIES = 200
+
+# Where the persistent workspace search index is stored
+INDEX_DIR = os.path.join(os.path.expanduser("~"), ".cache", "agentic")
+
+# Minimum time between full rescans of the working directory for the index
+INDEX_REFRESH_SECONDS = 5
+
+# Files larger than this are not indexed
+MAX_INDEXED_FILE_BYTES = 1024 * 1024
+
+# Maximum number of matching lines returned by one search_files call
+MAX_SEARCH_RESULTS = 50
@@ -0,0 +1,227 @@
+import os
+import re
+from tracing import current_span
+from .atomic import atomic_write
+from .paths import resolve_path, sandbox_root
+from .workspace_index import notify_write
+
+HUNK_HEADER = re.compile(r"^@@ -(\d+)(?:,\d+)? \+\d+(?:,\d+)? @@")
+
+
+class EditError(Exception):
+    """An edit that cannot be applied as given; the message is returned to the model."""
+
+
+def _parse_diff(diff):
+    """
+    Split a single-file unified diff into hunks.
+
+    Returns:
+        List of (old_start, old_lines, new_lines), lines without line endings
+    """
+    hunks = []
+    current = None
+    for line in diff.splitlines():
+        match = HUNK_HEADER.match(line)
+        if match:
+            current = (int(match.group(1)), [], [])
+            hunks.append(current)
+        elif current is None or line.startswith("\\"):
+            # File headers before the first hunk, "\ No newline at end of file" markers
+            continue
+        elif line.startswith("-"):
+            current[1].append(line[1:])
+        elif line.startswith("+"):
+            current[2].append(line[1:])
+        else:
+            # Context line; models often drop the leading space of an empty one
+            text = line[1:] if line.startswith(" ") else line
+            current[1].append(text)
+            current[2].append(text)
+    if not hunks:
+        raise EditError("diff contains no hunks")
+    return hunks
+
+
+def _find_block(lines, block, expected, start):
+    """Find block in lines at or after start, trying the position nearest expected first."""
+    expected = max(expected, start)
+    if not block:
+        return min(expected, len(lines))
+    last = len(lines) - len(block)
+    for index in sorted(range(start, last + 1), key=lambda index: abs(index - expected)):
+        if lines[index:index + len(block)] == block:
+            return index
+    return None
+
+
+def _diff_replacements(lines, diff):
+    """
+    Locate every hunk of a diff in the file.
+
+    Line numbers in hunk headers are only a hint: each hunk is matched on
+    its context and removed lines, nearest to the line it names.
+
+    Returns:
+        List of (start, end, new lines) replacing lines[start:end], in file order
+    """
+    plain = [line.rstrip("\r\n") for line in lines]
+    newline = "\r\n" if lines and lines[0].endswith("\r\n") else "\n"
+    replacements = []
+    position = 0
+    for old_start, old_lines, new_lines in _parse_diff(diff):
+        # "-N,0" adds lines after line N; otherwise the hunk starts at line N
+        expected = old_start if not old_lines else old_start - 1
+        index = _find_block(plain, old_lines, expected, position)
+        if index is None:
+            raise EditError(f"hunk @@ -{old_start} @@ does not match the file; read it again and resend the diff")
+        end = index + len(old_lines)
+        new_lines = [line + newline for line in new_lines]
+        # Keep a missing newline at the end of the file missing
+        if new_lines and end == len(lines) and lines and not lines[-1].endswith("\n"):
+            if index == end:
+                # Lines added after the last line: it needs a newline now
+                index -= 1
+                new_lines.insert(0, lines[-1] + newline)
+            new_lines[-1] = new_lines[-1].rstrip("\r\n")
+        replacements.append((index, end, new_lines))
+        position = end
+    return replacements
+
+
+def _replace_hunks(content, edits):
+    for number, edit in enumerate(edits, start=1):
+        search = edit.get("search", "")
+        if not search:
+            raise EditError(f"edit {number} has an empty search string")
+        count = content.count(search)
+        if count != 1:
+            found = "not found" if count == 0 else f"found {count} times; add surrounding lines to make it unique"
+            raise EditError(f"search text of edit {number} {found}")
+        content = content.replace(search, edit.get("replace", ""), 1)
+    return content
+
+
+def edit_file(working_directory, file_path, edits=None, diff=None, append=None, cache=None):
+    """
+    Change part of a file within the working directory.
+
+    Exactly one of edits, diff or append is used. The file is rewritten
+    through a temporary file renamed into place, so a failed edit leaves
+    it untouched; append adds to the end of the file directly.
+
+    Args:
+        working_directory: The base directory that limits file access
+        file_path: The relative path to the file within working_directory
+        edits: List of {"search": ..., "replace": ...}; each search text must occur exactly once
+        diff: Unified diff for this file
+        append: Text to add to the end of the file, which is created if missing
+        cache: Optional FileReadCache to invalidate for this file
+
+    Returns:
+        String containing success message or error message
+    """
+    try:
+        # Resolve .. components and symlinks; None means the path leaves the working directory
+        abs_working_directory = sandbox_root(working_directory)
+        abs_full_path = resolve_path(working_directory, file_path)
+
+        # Check if the resolved path is within the working directory
+        if abs_full_path is None:
+            return f'Error: Cannot edit "{file_path}" as it is outside the permitted working directory'
+
+        if sum(mode is not None for mode in (edits, diff, append)) != 1:
+            return 'Error: Provide exactly one of edits, diff or append'
+
+        exists = os.path.isfile(abs_full_path)
+        if not exists and append is None and edits is not None:
+            return f'Error: File not found or is not a regular file: "{file_path}"'
+
+        # Appending to or diffing against a missing file creates it
+        directory = os.path.dirname(abs_full_path)
+        if not exists and directory and not os.path.exists(directory):
+            os.makedirs(directory)
+
+        if append is not None:
+            with open(abs_full_path, 'a', encoding='utf-8', newline='') as file:
+                file.write(append)
+            bytes_written = len(append.encode('utf-8'))
+            message = f'Successfully appended to "{file_path}" ({len(append)} characters written)'
+
+        elif edits is not None:
+            with open(abs_full_path, 'r', encoding='utf-8', newline='') as file:
+                content = _replace_hunks(file.read(), edits)
+            with atomic_write(abs_full_path) as file:
+                file.write(content)
+            bytes_written = len(content.encode('utf-8'))
+            message = f'Successfully applied {len(edits)} edit(s) to "{file_path}"'
+
+        else:
+            lines = []
+            if exists:
+                with open(abs_full_path, 'r', encoding='utf-8', newline='') as file:
+                    lines = file.readlines()
+            replacements = _diff_replacements(lines, diff)
+
+            # Copy the unchanged runs of lines around each hunk straight to the new file
+            with atomic_write(abs_full_path) as file:
+                position = 0
+                for start, end, new_lines in replacements:
+                    file.writelines(lines[position:start])
+                    file.writelines(new_lines)
+                    position = end
+                file.writelines(lines[position:])
+            bytes_written = os.path.getsize(abs_full_path)
+            message = f'Successfully applied {len(replacements)} hunk(s) to "{file_path}"'
+
+        current_span().add("bytes_written", bytes_written)
+        if cache is not None:
+            cache.invalidate(abs_full_path)
+        notify_write(abs_working_directory, abs_full_path)
+
+        return message
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+# Function schema for LLM integration
+schema_edit_file = {
+    "name": "edit_file",
+    "description": "Changes part of a file within the working directory without resending all of it. Provide exactly one of: edits, a list of search/replace pairs; diff, a unified diff of the file; or append, text to add at the end. Prefer this to write_file for changes to existing files.",
+    "parameters": {
+        "type": "OBJECT",
+        "properties": {
+            "file_path": {
+                "type": "STRING",
+                "description": "The path to the file to edit, relative to the working directory.",
+            },
+            "edits": {
+                "type": "ARRAY",
+                "description": "Search/replace pairs applied in order. Each search text must occur exactly once in the file, so include enough surrounding lines to make it unique.",
+                "items": {
+                    "type": "OBJECT",
+                    "properties": {
+                        "search": {
+                            "type": "STRING",
+                            "description": "Exact text to find, including whitespace and line breaks.",
+                        },
+                        "replace": {
+                            "type": "STRING",
+                            "description": "Text to put in its place.",
+                        },
+                    },
+                    "required": ["search", "replace"],
+                },
+            },
+            "diff": {
+                "type": "STRING",
+                "description": "Unified diff with @@ hunk headers and context lines. Hunks are matched on their context, so line numbers may be approximate.",
+            },
+            "append": {
+                "type": "STRING",
+                "description": "Text to add to the end of the file. The file is created if it does not exist.",
+            },
+        },
+        "required": ["file_path"],
+    },
+}
@@ -0,0 +1,97 @@
+import sys
+import threading
+from collections import OrderedDict
+from tracing import current_span
+from .config import FILE_CACHE_MAX_BYTES
+
+
+class FileReadCache:
+    """
+    LRU cache of file contents read by get_file_content.
+
+    Entries are keyed on (absolute path, mtime_ns, size), so a file that has
+    changed on disk never matches an old entry. The least recently used
+    entries are evicted once the cached text takes more than max_bytes.
+    The cache is shared by the tool threads of one session, so every
+    operation takes a lock. Entries put there speculatively by the
+    prefetcher are counted separately, with the first real read of each
+    counted as a prefetch hit.
+    """
+
+    def __init__(self, max_bytes=FILE_CACHE_MAX_BYTES):
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+        self.prefetched = 0
+        self.prefetch_hits = 0
+        self._entries = OrderedDict()
+        self._size = 0
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """
+        Look up a cached read.
+
+        Args:
+            key: Tuple starting with (absolute path, mtime_ns, size)
+
+        Returns:
+            The cached value, or None on a miss
+        """
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                current_span().add("cache_misses")
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            current_span().add("cache_hits")
+            if entry[2]:
+                entry[2] = False
+                self.prefetch_hits += 1
+                current_span().add("prefetch_hits")
+            return entry[0]
+
+    def contains(self, key):
+        """Check for an entry without counting a hit or a miss."""
+        with self._lock:
+            return key in self._entries
+
+    def put(self, key, value, prefetched=False):
+        """
+        Store a read, evicting the least recently used entries to stay within budget.
+
+        Args:
+            key: Tuple starting with (absolute path, mtime_ns, size)
+            value: Tuple whose first item is the cached text
+            prefetched: Whether the read was speculative rather than asked for
+        """
+        size = sys.getsizeof(value[0])
+        if size > self.max_bytes:
+            return
+        with self._lock:
+            old = self._entries.pop(key, None)
+            if old is not None:
+                self._size -= old[1]
+            self._entries[key] = [value, size, prefetched]
+            self._size += size
+            if prefetched:
+                self.prefetched += 1
+            while self._size > self.max_bytes:
+                _, (_, evicted_size, _) = self._entries.popitem(last=False)
+                self._size -= evicted_size
+
+    def invalidate(self, abs_path):
+        """Drop every entry for a file, e.g. after it has been written."""
+        with self._lock:
+            for key in [key for key in self._entries if key[0] == abs_path]:
+                _, size, _ = self._entries.pop(key)
+                self._size -= size
+
+    def stats(self):
+        with self._lock:
+            stats = f"hits={self.hits}, misses={self.misses}, entries={len(self._entries)}, bytes={self._size}"
+            if self.prefetched:
+                stats += f", prefetched={self.prefetched}, prefetch_hits={self.prefetch_hits} ({self.prefetch_hits / self.prefetched:.0%})"
+            return stats
@@ -1,63 +1,159 @@
 import os
+import codecs
+from tracing import current_span
 from .config import MAX_FILE_SIZE_CHARS
-from google.genai import types
+from .paths import resolve_path
 
-def get_file_content(working_directory, file_path):
+# UTF-8 never needs more than this many bytes per character
+MAX_UTF8_BYTES_PER_CHAR = 4
+
+
+def _read_range(abs_path, offset, length):
+    """
+    Read up to `length` characters of a UTF-8 file, starting at byte `offset`.
+
+    Only a bounded window of the file is read, so memory use does not depend
+    on the file size.
+
+    Args:
+        abs_path: Absolute path to the file
+        offset: Byte offset to start reading from
+        length: Maximum number of characters to return
+
+    Returns:
+        Tuple of (content, number of bytes consumed from offset)
+    """
+    window = length * MAX_UTF8_BYTES_PER_CHAR
+    with open(abs_path, 'rb') as file:
+        file.seek(offset)
+        raw = file.read(window)
+    at_eof = len(raw) < window
+
+    # An offset in the middle of a character: skip to the start of the next one
+    skip = 0
+    if offset:
+        while skip < min(MAX_UTF8_BYTES_PER_CHAR - 1, len(raw)) and 0x80 <= raw[skip] <= 0xBF:
+            skip += 1
+
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    content = decoder.decode(raw[skip:], final=at_eof)
+    if len(content) > length:
+        content = content[:length]
+        return content, skip + len(content.encode('utf-8'))
+
+    # Bytes of a character cut off by the window stay in the decoder
+    pending = decoder.getstate()[0]
+    return content, len(raw) - len(pending)
+
+
+def get_file_content(working_directory, file_path, offset=0, length=MAX_FILE_SIZE_CHARS, cache=None):
     """
     Read the content of a file within the working directory.
     
     Args:
         working_directory: The base directory that limits file access
         file_path: The relative path to the file within working_directory
+        offset: Byte offset to start reading from, for paging through large files
+        length: Maximum number of characters to return, capped at MAX_FILE_SIZE_CHARS
+        cache: Optional FileReadCache shared by the session
     
     Returns:
         String containing file content or error message
     """
     try:
-        # Create the full path by joining working_directory and file_path
-        full_path = os.path.join(working_directory, file_path)
-        
-        # Get the absolute path to normalize it (resolve .. and . components)
-        abs_full_path = os.path.abspath(full_path)
-        abs_working_directory = os.path.abspath(working_directory)
+        # Resolve .. components and symlinks; None means the path leaves the working directory
+        abs_full_path = resolve_path(working_directory, file_path)
         
         # Check if the resolved path is within the working directory
-        if not abs_full_path.startswith(abs_working_directory):
+        if abs_full_path is None:
             return f'Error: Cannot read "{file_path}" as it is outside the permitted working directory'
         
         # Check if the path exists and is a file
-        if not os.path.exists(abs_full_path):
-            return f'Error: File not found or is not a regular file: "{file_path}"'
-        
         if not os.path.isfile(abs_full_path):
             return f'Error: File not found or is not a regular file: "{file_path}"'
         
-        # Read the file content
-        with open(abs_full_path, 'r', encoding='utf-8') as file:
-            content = file.read()
+        # The model sends numbers as floats
+        offset = int(offset)
+        length = min(int(length), MAX_FILE_SIZE_CHARS)
+        if offset < 0 or length <= 0:
+            return 'Error: offset must not be negative and length must be positive'
+        
+        stat = os.stat(abs_full_path)
+        if offset > stat.st_size:
+            return f'Error: offset {offset} is past the end of "{file_path}" ({stat.st_size} bytes)'
+        
+        # Reuse an earlier read if the file has not changed since
+        key = (abs_full_path, stat.st_mtime_ns, stat.st_size, offset, length)
+        cached = cache.get(key) if cache is not None else None
+        if cached is not None:
+            content, next_offset = cached
+        else:
+            # Read the requested range of the file
+            content, consumed = _read_range(abs_full_path, offset, length)
+            next_offset = offset + consumed
+            current_span().add("bytes_read", consumed)
+            
+            if cache is not None:
+                cache.put(key, (content, next_offset))
         
-        # Truncate if necessary
-        if len(content) > MAX_FILE_SIZE_CHARS:
-            content = content[:MAX_FILE_SIZE_CHARS]
-            content += f'[...File "{file_path}" truncated at {MAX_FILE_SIZE_CHARS} characters]'
+        # Tell the model where to continue if there is more to read
+        if next_offset < stat.st_size:
+            content += f'[...File "{file_path}" truncated at {len(content)} characters, continue reading with offset={next_offset}]'
         
         return content
     
     except Exception as e:
         return f"Error: {str(e)}"
 
+def prefetch_file_content(working_directory, file_path, cache):
+    """
+    Read the start of a file into the cache ahead of a get_file_content call.
+
+    Warms exactly the entry a default get_file_content(file_path) call would
+    look up, and marks it as prefetched so the cache can report hit rates.
+
+    Args:
+        working_directory: The base directory that limits file access
+        file_path: The relative path to the file within working_directory
+        cache: The session's FileReadCache
+
+    Returns:
+        True if the file was read, False if it was cached already or cannot be read
+    """
+    abs_full_path = resolve_path(working_directory, file_path)
+    if abs_full_path is None or not os.path.isfile(abs_full_path):
+        return False
+    try:
+        stat = os.stat(abs_full_path)
+        key = (abs_full_path, stat.st_mtime_ns, stat.st_size, 0, MAX_FILE_SIZE_CHARS)
+        if cache.contains(key):
+            return False
+        content, consumed = _read_range(abs_full_path, 0, MAX_FILE_SIZE_CHARS)
+    except (OSError, UnicodeDecodeError):
+        return False
+    cache.put(key, (content, consumed), prefetched=True)
+    return True
+
 # Function schema for LLM integration
-schema_get_file_content = types.FunctionDeclaration(
-    name="get_file_content",
-    description="Reads the content of a file within the working directory, with automatic truncation for large files.",
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "file_path": types.Schema(
-                type=types.Type.STRING,
-                description="The path to the file to read, relative to the working directory.",
-            ),
+schema_get_file_content = {
+    "name": "get_file_content",
+    "description": f"Reads the content of a file within the working directory, at most {MAX_FILE_SIZE_CHARS} characters at a time. Large files are truncated with a note giving the offset to continue reading from.",
+    "parameters": {
+        "type": "OBJECT",
+        "properties": {
+            "file_path": {
+                "type": "STRING",
+                "description": "The path to the file to read, relative to the working directory.",
+            },
+            "offset": {
+                "type": "INTEGER",
+                "description": "Byte offset to start reading from. Use the offset given in a truncation note to read the next part of a large file. Defaults to 0.",
+            },
+            "length": {
+                "type": "INTEGER",
+                "description": f"Maximum number of characters to read. Defaults to and is capped at {MAX_FILE_SIZE_CHARS}.",
+            },
         },
-        required=["file_path"],
-    ),
-)
+        "required": ["file_path"],
+    },
+}
@@ -1,17 +1,69 @@
 import os
-from google.genai import types
+from fnmatch import fnmatchcase
+from .config import MAX_LIST_ENTRIES
+from .gitignore import GitIgnore
+from .paths import resolve_path, sandbox_root
 
-def get_files_info(working_directory, directory="."):
+
+def _walk(abs_path, parts, depth, max_depth, cursor, is_ignored):
+    """
+    Yield (parts, entry, is_dir) for a directory tree, in sorted pre-order.
+
+    Sorted pre-order is the same order as comparing the paths as tuples of
+    components, so resuming after a cursor only needs to skip the subtrees
+    that sort entirely before it, even if the cursor entry has been deleted.
+    """
     try:
-        # Create the full path by joining working_directory and directory
-        full_path = os.path.join(working_directory, directory)
-        
-        # Get the absolute path to normalize it (resolve .. and . components)
-        abs_full_path = os.path.abspath(full_path)
-        abs_working_directory = os.path.abspath(working_directory)
+        with os.scandir(abs_path) as iterator:
+            entries = sorted(iterator, key=lambda entry: entry.name)
+    except OSError:
+        # The top-level directory was checked by the caller; skip unreadable subdirectories
+        if depth == 1:
+            raise
+        return
+
+    for entry in entries:
+        entry_parts = parts + (entry.name,)
+        is_dir = entry.is_dir()
+        if is_ignored(entry_parts, is_dir):
+            continue
+
+        if cursor:
+            if entry_parts < cursor and cursor[:len(entry_parts)] != entry_parts:
+                continue
+            if entry_parts > cursor:
+                yield entry_parts, entry, is_dir
+        else:
+            yield entry_parts, entry, is_dir
+
+        # Don't follow symlinked directories, they can loop or leave the working directory
+        if is_dir and depth < max_depth and not entry.is_symlink():
+            yield from _walk(entry.path, entry_parts, depth + 1, max_depth, cursor, is_ignored)
+
+
+def get_files_info(working_directory, directory=".", recursive=False, max_depth=None, pattern=None, cursor=None, limit=MAX_LIST_ENTRIES):
+    """
+    List the files in a directory within the working directory.
+    
+    Args:
+        working_directory: The base directory that limits file access
+        directory: The directory to list, relative to working_directory
+        recursive: Whether to list subdirectories too
+        max_depth: How many levels deep to go when recursive, unlimited if not given
+        pattern: Optional glob; only matching entries are listed
+        cursor: Path returned by a previous call to continue listing after
+        limit: Maximum number of entries to return, capped at MAX_LIST_ENTRIES
+    
+    Returns:
+        String with one line per entry, or an error message
+    """
+    try:
+        # Resolve .. components and symlinks; None means the path leaves the working directory
+        abs_working_directory = sandbox_root(working_directory)
+        abs_full_path = resolve_path(working_directory, directory)
         
         # Check if the resolved path is within the working directory
-        if not abs_full_path.startswith(abs_working_directory):
+        if abs_full_path is None:
             return f'Error: Cannot list "{directory}" as it is outside the permitted working directory'
         
         # Check if the path exists and is a directory
@@ -21,13 +73,47 @@ def get_files_info(working_directory, directory="."):
         if not os.path.isdir(abs_full_path):
             return f'Error: "{directory}" is not a directory'
         
+        # The model sends numbers as floats
+        limit = min(int(limit), MAX_LIST_ENTRIES)
+        max_depth = None if max_depth is None else int(max_depth)
+        if limit <= 0 or (max_depth is not None and max_depth <= 0):
+            return 'Error: limit and max_depth must be positive'
+        if not recursive:
+            max_depth = 1
+        elif max_depth is None:
+            max_depth = float("inf")
+        
+        # .gitignore rules are relative to the working directory, not the listed directory
+        gitignore = GitIgnore(abs_working_directory)
+        rel_directory = os.path.relpath(abs_full_path, abs_working_directory)
+        base_parts = () if rel_directory == "." else tuple(rel_directory.split(os.sep))
+        
+        def is_ignored(parts, is_dir):
+            return gitignore.is_ignored("/".join(base_parts + parts), is_dir)
+        
+        cursor_parts = tuple(cursor.strip("/").split("/")) if cursor else None
+        
         # List the contents of the directory
         items = []
-        for item in os.listdir(abs_full_path):
-            item_path = os.path.join(abs_full_path, item)
-            file_size = os.path.getsize(item_path)
-            is_dir = os.path.isdir(item_path)
-            items.append(f" - {item}: file_size={file_size} bytes, is_dir={is_dir}")
+        last_parts = None
+        for parts, entry, is_dir in _walk(abs_full_path, (), 1, max_depth, cursor_parts, is_ignored):
+            name = "/".join(parts)
+            if pattern and not fnmatchcase(name if "/" in pattern else entry.name, pattern):
+                continue
+            
+            if len(items) == limit:
+                items.append(f'[...More entries not shown, continue listing with cursor="{"/".join(last_parts)}"]')
+                break
+            
+            # DirEntry caches the file type from the directory scan, so only the size needs a stat;
+            # a symlink leading out of the working directory is listed without looking at its target
+            follow = not entry.is_symlink() or resolve_path(abs_working_directory, entry.path) is not None
+            try:
+                file_size = entry.stat(follow_symlinks=follow).st_size
+            except OSError:
+                file_size = 0
+            items.append(f" - {name}: file_size={file_size} bytes, is_dir={is_dir}")
+            last_parts = parts
         
         return "\n".join(items)
     
@@ -35,16 +121,36 @@ def get_files_info(working_directory, directory="."):
         return f"Error: {str(e)}"
 
 # Function schema for LLM integration
-schema_get_files_info = types.FunctionDeclaration(
-    name="get_files_info",
-    description="Lists files in the specified directory along with their sizes, constrained to the working directory.",
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "directory": types.Schema(
-                type=types.Type.STRING,
-                description="The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself.",
-            ),
+schema_get_files_info = {
+    "name": "get_files_info",
+    "description": f"Lists files in the specified directory along with their sizes, constrained to the working directory. Files ignored by .gitignore are skipped. At most {MAX_LIST_ENTRIES} entries are returned per call; longer listings end with a cursor to continue from.",
+    "parameters": {
+        "type": "OBJECT",
+        "properties": {
+            "directory": {
+                "type": "STRING",
+                "description": "The directory to list files from, relative to the working directory. If not provided, lists files in the working directory itself.",
+            },
+            "recursive": {
+                "type": "BOOLEAN",
+                "description": "Whether to list the contents of subdirectories as well. Defaults to false.",
+            },
+            "max_depth": {
+                "type": "INTEGER",
+                "description": "How many directory levels to descend when recursive. Unlimited if not provided.",
+            },
+            "pattern": {
+                "type": "STRING",
+                "description": "Glob pattern such as \"*.py\"; only matching entries are listed. Patterns containing \"/\" match the path relative to the listed directory.",
+            },
+            "cursor": {
+                "type": "STRING",
+                "description": "Cursor from a previous truncated listing, to continue after it.",
+            },
+            "limit": {
+                "type": "INTEGER",
+                "description": f"Maximum number of entries to return. Defaults to and is capped at {MAX_LIST_ENTRIES}.",
+            },
         },
-    ),
-)
\ No newline at end of file
+    },
+}
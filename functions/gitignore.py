@@ -0,0 +1,75 @@
+import os
+from fnmatch import fnmatchcase
+
+# Never worth listing or indexing, whatever .gitignore says
+ALWAYS_IGNORED = frozenset({".git"})
+
+
+class GitIgnore:
+    """
+    Minimal .gitignore matcher for walking the working directory.
+
+    Supports comments, negation with "!", directory-only patterns ending in
+    "/", patterns anchored to their .gitignore by a "/", and shell wildcards.
+    .gitignore files are read lazily, once per directory, from the root down
+    to the path being checked; later rules override earlier ones as in git.
+    """
+
+    def __init__(self, root):
+        self.root = root
+        self._rules = {}
+
+    def _rules_for(self, rel_dir):
+        rules = self._rules.get(rel_dir)
+        if rules is not None:
+            return rules
+
+        rules = []
+        try:
+            with open(os.path.join(self.root, rel_dir, ".gitignore"), 'r', encoding='utf-8') as file:
+                lines = file.read().splitlines()
+        except OSError:
+            lines = []
+
+        for line in lines:
+            line = line.rstrip()
+            if not line or line.startswith("#"):
+                continue
+            negate = line.startswith("!")
+            if negate:
+                line = line[1:]
+            dir_only = line.endswith("/")
+            line = line.rstrip("/")
+            # A slash anywhere but the end anchors the pattern to this directory
+            anchored = "/" in line
+            line = line.lstrip("/")
+            if line:
+                rules.append((line, negate, dir_only, anchored))
+
+        self._rules[rel_dir] = rules
+        return rules
+
+    def is_ignored(self, rel_path, is_dir):
+        """
+        Check a path against the .gitignore files above it.
+
+        Args:
+            rel_path: Path relative to the root, using "/" separators
+            is_dir: Whether the path is a directory
+
+        Returns:
+            True if the path should be skipped
+        """
+        parts = rel_path.split("/")
+        if parts[-1] in ALWAYS_IGNORED:
+            return True
+
+        ignored = False
+        for depth in range(len(parts)):
+            sub_path = "/".join(parts[depth:])
+            for pattern, negate, dir_only, anchored in self._rules_for("/".join(parts[:depth])):
+                if dir_only and not is_dir:
+                    continue
+                if fnmatchcase(sub_path if anchored else parts[-1], pattern):
+                    ignored = not negate
+        return ignored
@@ -0,0 +1,35 @@
+import os
+from functools import lru_cache
+
+
+@lru_cache(maxsize=64)
+def _real_root(abs_working_directory):
+    return os.path.realpath(abs_working_directory)
+
+
+def sandbox_root(working_directory):
+    """Return the working directory as an absolute path with symlinks resolved, cached per directory."""
+    return _real_root(os.path.abspath(working_directory))
+
+
+def resolve_path(working_directory, path):
+    """
+    Resolve a path given relative to the working directory, refusing escapes.
+
+    Both the working directory and the path are resolved with realpath, so
+    ".." components and symlinks pointing outside are caught, and the check
+    compares whole path components: "/work/calc" does not admit
+    "/work/calculator_secrets".
+
+    Args:
+        working_directory: The base directory that limits file access
+        path: Path relative to working_directory
+
+    Returns:
+        The resolved absolute path, or None if it is outside working_directory
+    """
+    root = sandbox_root(working_directory)
+    full_path = os.path.realpath(os.path.join(root, path))
+    if full_path != root and os.path.commonpath([root, full_path]) != root:
+        return None
+    return full_path
@@ -0,0 +1,81 @@
+from fnmatch import fnmatchcase
+from .config import MAX_SEARCH_RESULTS
+from .paths import resolve_path
+from .workspace_index import get_index
+
+# Longest line shown in search results
+MAX_RESULT_LINE_CHARS = 200
+
+
+def search_files(working_directory, query, pattern=None, max_results=MAX_SEARCH_RESULTS):
+    """
+    Search the text files in the working directory for a string.
+
+    Args:
+        working_directory: The base directory that limits file access
+        query: Case-insensitive text to search for
+        pattern: Optional glob restricting which files are searched
+        max_results: Maximum number of matching lines to return
+
+    Returns:
+        String with one "path:line: text" entry per match, or an error message
+    """
+    try:
+        if not query:
+            return 'Error: query must not be empty'
+        max_results = min(int(max_results), MAX_SEARCH_RESULTS)
+
+        index = get_index(working_directory)
+        index.refresh()
+
+        needle = query.lower()
+        results = []
+        for rel_path in index.candidates(query):
+            if pattern and not fnmatchcase(rel_path if "/" in pattern else rel_path.rsplit("/", 1)[-1], pattern):
+                continue
+            # An index written before a symlink was retargeted may name a path that now leaves the root
+            abs_path = resolve_path(index.root, rel_path)
+            if abs_path is None:
+                continue
+            # Trigrams only narrow it down; confirm the match on the actual lines
+            try:
+                with open(abs_path, 'r', encoding='utf-8') as file:
+                    for line_number, line in enumerate(file, start=1):
+                        if needle in line.lower():
+                            results.append(f"{rel_path}:{line_number}: {line.rstrip()[:MAX_RESULT_LINE_CHARS]}")
+                            if len(results) == max_results:
+                                results.append(f'[...Stopped after {max_results} matches]')
+                                return "\n".join(results)
+            except (OSError, UnicodeDecodeError):
+                continue
+
+        if not results:
+            return f'No matches found for "{query}"'
+        return "\n".join(results)
+
+    except Exception as e:
+        return f"Error: {str(e)}"
+
+# Function schema for LLM integration
+schema_search_files = {
+    "name": "search_files",
+    "description": "Searches the text files in the working directory for a string, case-insensitively, using a persistent index. Returns matching lines as path:line: text. Use this instead of reading many files to find where something is defined or used.",
+    "parameters": {
+        "type": "OBJECT",
+        "properties": {
+            "query": {
+                "type": "STRING",
+                "description": "The text to search for.",
+            },
+            "pattern": {
+                "type": "STRING",
+                "description": "Optional glob such as \"*.py\" to restrict which files are searched. Patterns containing \"/\" match the path relative to the working directory.",
+            },
+            "max_results": {
+                "type": "INTEGER",
+                "description": f"Maximum number of matching lines to return. Defaults to and is capped at {MAX_SEARCH_RESULTS}.",
+            },
+        },
+        "required": ["query"],
+    },
+}
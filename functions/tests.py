@@ -0,0 +1,212 @@
+# tests.py
+#
+# Run from the repository root: python -m unittest functions.tests
+
+import os
+import shutil
+import tempfile
+import unittest
+from functions import workspace_index
+from functions.atomic import atomic_write
+from functions.edit_file import edit_file
+from functions.get_file_content import get_file_content
+from functions.get_files_info import get_files_info
+from functions.paths import resolve_path
+from functions.search_files import search_files
+from functions.write_file import write_file
+
+
+class SandboxTestCase(unittest.TestCase):
+    # A working directory with a secret file next to it, outside the sandbox
+    def setUp(self):
+        self.base = os.path.realpath(tempfile.mkdtemp())
+        self.addCleanup(shutil.rmtree, self.base)
+        self.root = os.path.join(self.base, "work")
+        self.outside = os.path.join(self.base, "outside")
+        os.makedirs(self.root)
+        os.makedirs(self.outside)
+        with open(os.path.join(self.root, "inside.txt"), "w") as file:
+            file.write("SECRET_TOKEN=visible\n")
+        with open(os.path.join(self.outside, "secret.txt"), "w") as file:
+            file.write("SECRET_TOKEN=hunter2\n")
+        os.symlink(os.path.join(self.outside, "secret.txt"), os.path.join(self.root, "link.txt"))
+
+        # Keep the search index out of the user's cache directory
+        index = workspace_index.WorkspaceIndex(self.root, index_dir=os.path.join(self.base, "index"))
+        workspace_index._indexes[self.root] = index
+        self.addCleanup(workspace_index._indexes.pop, self.root)
+        self.addCleanup(index.close)
+
+
+class TestResolvePath(SandboxTestCase):
+    def test_inside(self):
+        self.assertEqual(resolve_path(self.root, "a/../inside.txt"), os.path.join(self.root, "inside.txt"))
+        self.assertEqual(resolve_path(self.root, "."), self.root)
+
+    def test_parent_escape(self):
+        self.assertIsNone(resolve_path(self.root, "../outside/secret.txt"))
+
+    def test_sibling_with_same_prefix(self):
+        # "work_secrets" starts with "work" but is not inside it
+        os.makedirs(self.root + "_secrets")
+        self.assertIsNone(resolve_path(self.root, "../work_secrets/key.txt"))
+
+    def test_symlink_outside(self):
+        self.assertIsNone(resolve_path(self.root, "link.txt"))
+        os.symlink(self.outside, os.path.join(self.root, "linked_dir"))
+        self.assertIsNone(resolve_path(self.root, "linked_dir/secret.txt"))
+
+    def test_symlink_inside(self):
+        os.symlink(os.path.join(self.root, "inside.txt"), os.path.join(self.root, "alias.txt"))
+        self.assertEqual(resolve_path(self.root, "alias.txt"), os.path.join(self.root, "inside.txt"))
+
+    def test_tools_refuse_escapes(self):
+        os.makedirs(self.root + "_secrets")
+        self.assertTrue(get_file_content(self.root, "link.txt").startswith("Error:"))
+        self.assertTrue(get_file_content(self.root, "../work_secrets/key.txt").startswith("Error:"))
+        self.assertTrue(get_files_info(self.root, "../work_secrets").startswith("Error:"))
+        self.assertTrue(write_file(self.root, "link.txt", "x").startswith("Error:"))
+        with open(os.path.join(self.outside, "secret.txt")) as file:
+            self.assertEqual(file.read(), "SECRET_TOKEN=hunter2\n")
+
+    def test_listing_does_not_stat_outside_target(self):
+        listing = get_files_info(self.root)
+        self.assertIn(f" - link.txt: file_size={len(os.readlink(os.path.join(self.root, 'link.txt')))} bytes", listing)
+
+
+class TestGetFilesInfo(SandboxTestCase):
+    def test_depth(self):
+        os.makedirs(os.path.join(self.root, "a", "b"))
+        self.assertNotIn("a/b", get_files_info(self.root, recursive=True, max_depth=1))
+        self.assertIn("a/b", get_files_info(self.root, recursive=True, max_depth=2))
+        self.assertIn("a/b", get_files_info(self.root, recursive=True))
+
+    def test_rejects_non_positive_limit_and_depth(self):
+        for kwargs in ({"limit": 0}, {"limit": -1}, {"recursive": True, "max_depth": 0}, {"max_depth": -2.0}):
+            with self.subTest(**kwargs):
+                self.assertEqual(get_files_info(self.root, **kwargs), "Error: limit and max_depth must be positive")
+
+
+class TestSearchFiles(SandboxTestCase):
+    def test_does_not_follow_symlink_outside(self):
+        result = search_files(self.root, "SECRET_TOKEN")
+        self.assertIn("inside.txt:1: SECRET_TOKEN=visible", result)
+        self.assertNotIn("hunter2", result)
+        self.assertNotIn("link.txt", result)
+
+    def test_follows_symlink_inside(self):
+        os.symlink(os.path.join(self.root, "inside.txt"), os.path.join(self.root, "alias.txt"))
+        self.assertIn("alias.txt:1:", search_files(self.root, "visible"))
+
+
+class TestEditFile(SandboxTestCase):
+    def write(self, name, content):
+        with open(os.path.join(self.root, name), "w", encoding="utf-8", newline="") as file:
+            file.write(content)
+
+    def read(self, name):
+        with open(os.path.join(self.root, name), encoding="utf-8", newline="") as file:
+            return file.read()
+
+    def test_diff_matches_context_not_line_numbers(self):
+        self.write("a.py", "one\ntwo\nthree\nfour\n")
+        diff = "--- a/a.py\n+++ b/a.py\n@@ -1,2 +1,2 @@\n three\n-four\n+FOUR\n"
+        result = edit_file(self.root, "a.py", diff=diff)
+        self.assertTrue(result.startswith("Successfully"), result)
+        self.assertEqual(self.read("a.py"), "one\ntwo\nthree\nFOUR\n")
+
+    def test_diff_nearest_match_wins(self):
+        self.write("a.py", "x\ny\nx\ny\n")
+        edit_file(self.root, "a.py", diff="@@ -3,2 +3,2 @@\n x\n-y\n+z\n")
+        self.assertEqual(self.read("a.py"), "x\ny\nx\nz\n")
+
+    def test_diff_mismatch_leaves_file(self):
+        self.write("a.py", "one\ntwo\n")
+        result = edit_file(self.root, "a.py", diff="@@ -1 +1 @@\n-three\n+3\n")
+        self.assertTrue(result.startswith("Error:"), result)
+        self.assertEqual(self.read("a.py"), "one\ntwo\n")
+        self.assertEqual(sorted(os.listdir(self.root)), ["a.py", "inside.txt", "link.txt"])
+
+    def test_diff_inserts_after_named_line(self):
+        # diff -U0 output: "-2,0" adds lines after line 2
+        self.write("a.txt", "a\nb\nc\n")
+        edit_file(self.root, "a.txt", diff="@@ -2,0 +3 @@\n+INSERTED\n")
+        self.assertEqual(self.read("a.txt"), "a\nb\nINSERTED\nc\n")
+
+    def test_diff_inserts_at_start(self):
+        self.write("a.txt", "a\nb\n")
+        edit_file(self.root, "a.txt", diff="@@ -0,0 +1 @@\n+first\n")
+        self.assertEqual(self.read("a.txt"), "first\na\nb\n")
+
+    def test_diff_keeps_crlf(self):
+        self.write("a.txt", "one\r\ntwo\r\n")
+        edit_file(self.root, "a.txt", diff="@@ -1,2 +1,3 @@\n one\n+one and a half\n two\n")
+        self.assertEqual(self.read("a.txt"), "one\r\none and a half\r\ntwo\r\n")
+
+    def test_diff_keeps_missing_final_newline(self):
+        self.write("a.txt", "one\ntwo")
+        edit_file(self.root, "a.txt", diff="@@ -2 +2 @@\n-two\n\\ No newline at end of file\n+TWO\n")
+        self.assertEqual(self.read("a.txt"), "one\nTWO")
+
+    def test_diff_adds_after_missing_final_newline(self):
+        self.write("a.txt", "one\ntwo")
+        edit_file(self.root, "a.txt", diff="@@ -2,0 +3 @@\n+three\n")
+        self.assertEqual(self.read("a.txt"), "one\ntwo\nthree")
+
+    def test_edits(self):
+        self.write("a.py", "x = 1\ny = 1\n")
+        result = edit_file(self.root, "a.py", edits=[{"search": "y = 1", "replace": "y = 2"}])
+        self.assertTrue(result.startswith("Successfully"), result)
+        self.assertEqual(self.read("a.py"), "x = 1\ny = 2\n")
+
+    def test_edits_must_be_unique(self):
+        self.write("a.py", "x = 1\ny = 1\n")
+        result = edit_file(self.root, "a.py", edits=[{"search": "= 1", "replace": "= 2"}])
+        self.assertIn("found 2 times", result)
+        self.assertEqual(self.read("a.py"), "x = 1\ny = 1\n")
+
+    def test_append(self):
+        edit_file(self.root, "new/log.txt", append="first\n")
+        edit_file(self.root, "new/log.txt", append="second\n")
+        self.assertEqual(self.read("new/log.txt"), "first\nsecond\n")
+
+    def test_one_mode_only(self):
+        self.write("a.py", "x\n")
+        result = edit_file(self.root, "a.py", diff="@@ -1 +1 @@\n-x\n+y\n", append="z")
+        self.assertTrue(result.startswith("Error:"), result)
+
+    def test_refuses_symlink_outside(self):
+        result = edit_file(self.root, "link.txt", append="x")
+        self.assertTrue(result.startswith("Error:"), result)
+        self.assertEqual(get_file_content(self.outside, "secret.txt"), "SECRET_TOKEN=hunter2\n")
+
+
+class TestAtomicWrite(SandboxTestCase):
+    def test_new_file_mode_follows_umask(self):
+        old_umask = os.umask(0o027)
+        self.addCleanup(os.umask, old_umask)
+        path = os.path.join(self.root, "new.txt")
+        with atomic_write(path) as file:
+            file.write("x")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o640)
+        self.assertEqual(os.umask(0o027), 0o027)
+
+    def test_keeps_existing_mode(self):
+        path = os.path.join(self.root, "inside.txt")
+        os.chmod(path, 0o600)
+        with atomic_write(path) as file:
+            file.write("y")
+        self.assertEqual(os.stat(path).st_mode & 0o777, 0o600)
+
+    def test_failure_leaves_file(self):
+        path = os.path.join(self.root, "inside.txt")
+        with self.assertRaises(RuntimeError):
+            with atomic_write(path) as file:
+                file.write("partial")
+                raise RuntimeError
+        self.assertEqual(get_file_content(self.root, "inside.txt"), "SECRET_TOKEN=visible\n")
+        self.assertEqual(sorted(os.listdir(self.root)), ["inside.txt", "link.txt"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,193 @@
+import os
+import time
+import sqlite3
+import hashlib
+import threading
+from .config import INDEX_DIR, INDEX_REFRESH_SECONDS, MAX_INDEXED_FILE_BYTES
+from .gitignore import GitIgnore
+from .paths import resolve_path
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS files (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS trigrams (
+    trigram TEXT NOT NULL,
+    path TEXT NOT NULL,
+    PRIMARY KEY (trigram, path)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS trigrams_by_path ON trigrams (path);
+"""
+
+
+def _trigrams(text):
+    return {text[i:i + 3] for i in range(len(text) - 2)}
+
+
+def _read_text(abs_path):
+    """Return the lowercased text of a file, or None for binary or non-UTF-8 files."""
+    with open(abs_path, 'rb') as file:
+        raw = file.read(MAX_INDEXED_FILE_BYTES + 1)
+    if len(raw) > MAX_INDEXED_FILE_BYTES or b"\0" in raw:
+        return None
+    try:
+        return raw.decode('utf-8').lower()
+    except UnicodeDecodeError:
+        return None
+
+
+class WorkspaceIndex:
+    """
+    Persistent trigram index of the text files in a working directory.
+
+    The index lives in an SQLite database under INDEX_DIR and survives
+    between sessions. refresh() rescans the directory and re-indexes only
+    the files whose mtime or size changed; note_write() re-indexes a single
+    file straight after it is written. Searches use the trigrams to pick
+    candidate files, so only files that can contain the query are read.
+    """
+
+    def __init__(self, root, index_dir=INDEX_DIR):
+        self.root = root
+        os.makedirs(index_dir, exist_ok=True)
+        name = hashlib.sha1(root.encode('utf-8')).hexdigest()
+        self.path = os.path.join(index_dir, f"{name}.sqlite")
+        self._connection = sqlite3.connect(self.path, check_same_thread=False)
+        self._connection.executescript(SCHEMA)
+        self._lock = threading.Lock()
+        self._last_refresh = 0.0
+
+    def _walk(self, gitignore, abs_path="", rel_parts=()):
+        """Yield (relative path, DirEntry) for every file that is not ignored and stays inside the root."""
+        try:
+            with os.scandir(abs_path or self.root) as iterator:
+                entries = list(iterator)
+        except OSError:
+            return
+        for entry in entries:
+            parts = rel_parts + (entry.name,)
+            rel_path = "/".join(parts)
+            is_dir = entry.is_dir(follow_symlinks=False)
+            if gitignore.is_ignored(rel_path, is_dir):
+                continue
+            if is_dir:
+                yield from self._walk(gitignore, entry.path, parts)
+            elif entry.is_file(follow_symlinks=False):
+                yield rel_path, entry
+            elif entry.is_symlink() and entry.is_file() and resolve_path(self.root, rel_path) is not None:
+                # Only links to files inside the working directory; the rest would leak outside content
+                yield rel_path, entry
+
+    def _index_file(self, rel_path, abs_path, mtime_ns, size):
+        self._connection.execute("DELETE FROM trigrams WHERE path = ?", (rel_path,))
+        try:
+            text = _read_text(abs_path)
+        except OSError:
+            text = None
+        if text is not None:
+            self._connection.executemany(
+                "INSERT INTO trigrams (trigram, path) VALUES (?, ?)",
+                ((trigram, rel_path) for trigram in _trigrams(text)),
+            )
+        self._connection.execute(
+            "INSERT OR REPLACE INTO files (path, mtime_ns, size) VALUES (?, ?, ?)",
+            (rel_path, mtime_ns, size),
+        )
+
+    def _remove_file(self, rel_path):
+        self._connection.execute("DELETE FROM trigrams WHERE path = ?", (rel_path,))
+        self._connection.execute("DELETE FROM files WHERE path = ?", (rel_path,))
+
+    def refresh(self, force=False):
+        """
+        Bring the index up to date with the working directory.
+
+        Args:
+            force: Rescan even if the last scan was less than INDEX_REFRESH_SECONDS ago
+        """
+        with self._lock:
+            if not force and time.monotonic() - self._last_refresh < INDEX_REFRESH_SECONDS:
+                return
+            known = dict(
+                (path, (mtime_ns, size))
+                for path, mtime_ns, size in self._connection.execute("SELECT path, mtime_ns, size FROM files")
+            )
+            with self._connection:
+                for rel_path, entry in self._walk(GitIgnore(self.root)):
+                    stat = entry.stat()
+                    if known.pop(rel_path, None) != (stat.st_mtime_ns, stat.st_size):
+                        self._index_file(rel_path, entry.path, stat.st_mtime_ns, stat.st_size)
+                # Anything not seen in the scan has been deleted
+                for rel_path in known:
+                    self._remove_file(rel_path)
+            self._last_refresh = time.monotonic()
+
+    def note_write(self, abs_path):
+        """
+        Re-index one file after it has been written.
+
+        Args:
+            abs_path: Absolute path of the file inside the working directory
+        """
+        rel_path = os.path.relpath(abs_path, self.root).replace(os.sep, "/")
+        if GitIgnore(self.root).is_ignored(rel_path, False):
+            return
+        with self._lock, self._connection:
+            try:
+                stat = os.stat(abs_path)
+            except OSError:
+                self._remove_file(rel_path)
+                return
+            self._index_file(rel_path, abs_path, stat.st_mtime_ns, stat.st_size)
+
+    def candidates(self, query):
+        """
+        Find the files that contain every trigram of a query.
+
+        Args:
+            query: Text to search for
+
+        Returns:
+            Sorted list of paths relative to the root
+        """
+        trigrams = sorted(_trigrams(query.lower()))
+        with self._lock:
+            if not trigrams:
+                # Queries shorter than a trigram can be in any file
+                rows = self._connection.execute("SELECT path FROM files ORDER BY path")
+            else:
+                placeholders = ", ".join("?" * len(trigrams))
+                rows = self._connection.execute(
+                    f"SELECT path FROM trigrams WHERE trigram IN ({placeholders}) "
+                    "GROUP BY path HAVING COUNT(*) = ? ORDER BY path",
+                    (*trigrams, len(trigrams)),
+                )
+            return [path for (path,) in rows]
+
+    def close(self):
+        with self._lock:
+            self._connection.close()
+
+
+# One index per working directory, shared by every session in the process
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def get_index(working_directory):
+    """Return the WorkspaceIndex for a working directory, opening it on first use."""
+    root = os.path.realpath(working_directory)
+    with _indexes_lock:
+        index = _indexes.get(root)
+        if index is None:
+            index = _indexes[root] = WorkspaceIndex(root)
+        return index
+
+
+def notify_write(working_directory, abs_path):
+    """Tell the index for a working directory that a file was written, if it is open."""
+    index = _indexes.get(os.path.realpath(working_directory))
+    if index is not None:
+        index.note_write(os.path.realpath(abs_path))
@@ -1,8 +1,11 @@
 import os
+from tracing import current_span
 from .config import MAX_FILE_SIZE_CHARS
-from google.genai import types
+from .workspace_index import notify_write
+from .atomic import atomic_write
+from .paths import resolve_path, sandbox_root
 
-def write_file(working_directory, file_path, content):
+def write_file(working_directory, file_path, content, cache=None):
     """
     Write content to a file within the working directory.
     
@@ -10,20 +13,18 @@ def write_file(working_directory, file_path, content):
         working_directory: The base directory that limits file access
         file_path: The relative path to the file within working_directory
         content: The content to write to the file
+        cache: Optional FileReadCache to invalidate for this file
     
     Returns:
         String containing success message or error message
     """
     try:
-        # Create the full path by joining working_directory and file_path
-        full_path = os.path.join(working_directory, file_path)
-        
-        # Get the absolute path to normalize it (resolve .. and . components)
-        abs_full_path = os.path.abspath(full_path)
-        abs_working_directory = os.path.abspath(working_directory)
+        # Resolve .. components and symlinks; None means the path leaves the working directory
+        abs_working_directory = sandbox_root(working_directory)
+        abs_full_path = resolve_path(working_directory, file_path)
         
         # Check if the resolved path is within the working directory
-        if not abs_full_path.startswith(abs_working_directory):
+        if abs_full_path is None:
             return f'Error: Cannot write to "{file_path}" as it is outside the permitted working directory'
         
         # Create the directory if it doesn't exist
@@ -31,9 +32,14 @@ def write_file(working_directory, file_path, content):
         if directory and not os.path.exists(directory):
             os.makedirs(directory)
         
-        # Write the content to the file
-        with open(abs_full_path, 'w', encoding='utf-8') as file:
+        # Write the content to a temporary file and rename it into place
+        with atomic_write(abs_full_path) as file:
             file.write(content)
+        current_span().add("bytes_written", len(content.encode('utf-8')))
+        
+        if cache is not None:
+            cache.invalidate(abs_full_path)
+        notify_write(abs_working_directory, abs_full_path)
         
         # Return success message
         return f'Successfully wrote to "{file_path}" ({len(content)} characters written)'
@@ -42,21 +48,21 @@ def write_file(working_directory, file_path, content):
         return f"Error: {str(e)}"
 
 # Function schema for LLM integration
-schema_write_file = types.FunctionDeclaration(
-    name="write_file",
-    description="Writes or overwrites content to a file within the working directory, creating directories as needed.",
-    parameters=types.Schema(
-        type=types.Type.OBJECT,
-        properties={
-            "file_path": types.Schema(
-                type=types.Type.STRING,
-                description="The path to the file to write to, relative to the working directory.",
-            ),
-            "content": types.Schema(
-                type=types.Type.STRING,
-                description="The content to write to the file.",
-            ),
+schema_write_file = {
+    "name": "write_file",
+    "description": "Writes or overwrites content to a file within the working directory, creating directories as needed.",
+    "parameters": {
+        "type": "OBJECT",
+        "properties": {
+            "file_path": {
+                "type": "STRING",
+                "description": "The path to the file to write to, relative to the working directory.",
+            },
+            "content": {
+                "type": "STRING",
+                "description": "The content to write to the file.",
+            },
         },
-        required=["file_path", "content"],
-    ),
-)
+        "required": ["file_path", "content"],
+    },
+}
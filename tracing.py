@@ -0,0 +1,161 @@
+import os
+import json
+import time
+import threading
+import contextvars
+from contextlib import contextmanager
+
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+class Span:
+    """
+    One timed operation, exported in the shape of an OpenTelemetry span.
+
+    Attributes hold counters and labels such as token counts, bytes read
+    and cache hits; add() increments a counter so nested code can report
+    into the span that is currently open.
+    """
+
+    def __init__(self, name, parent, attributes):
+        self.name = name
+        self.trace_id = parent.trace_id if parent else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_span_id = parent.span_id if parent else None
+        self.attributes = dict(attributes)
+        self.status = "OK"
+        self.start_time_unix_nano = time.time_ns()
+        self.end_time_unix_nano = None
+        self._start = time.perf_counter()
+        self.duration_ms = None
+
+    def set(self, key, value):
+        self.attributes[key] = value
+
+    def add(self, key, amount=1):
+        self.attributes[key] = self.attributes.get(key, 0) + amount
+
+    def end(self):
+        self.duration_ms = (time.perf_counter() - self._start) * 1000
+        self.end_time_unix_nano = time.time_ns()
+
+    def to_dict(self):
+        return {
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "name": self.name,
+            "start_time_unix_nano": self.start_time_unix_nano,
+            "end_time_unix_nano": self.end_time_unix_nano,
+            "duration_ms": round(self.duration_ms, 3),
+            "status": self.status,
+            "attributes": self.attributes,
+        }
+
+
+class _NoopSpan:
+    """Stands in for a Span when tracing is off, so callers never need to check."""
+
+    def set(self, key, value):
+        pass
+
+    def add(self, key, amount=1):
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+class JsonlExporter:
+    """Appends each finished span to a file as one JSON line."""
+
+    def __init__(self, path):
+        self._file = open(path, 'a', encoding='utf-8')
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        line = json.dumps(span.to_dict(), default=str)
+        with self._lock:
+            self._file.write(line + "\n")
+            self._file.flush()
+
+    def close(self):
+        with self._lock:
+            self._file.close()
+
+
+class MemoryExporter:
+    """Keeps finished spans in a list, for benchmarks and tests."""
+
+    def __init__(self):
+        self.spans = []
+        self._lock = threading.Lock()
+
+    def export(self, span):
+        with self._lock:
+            self.spans.append(span)
+
+    def close(self):
+        pass
+
+
+_exporter = None
+
+
+def configure(exporter):
+    """
+    Turn tracing on for the whole process, or off again with None.
+
+    Args:
+        exporter: Object with export(span) and close(), e.g. JsonlExporter
+    """
+    global _exporter
+    if _exporter is not None:
+        _exporter.close()
+    _exporter = exporter
+
+
+@contextmanager
+def span(name, **attributes):
+    """
+    Time a block of code as a child of the span currently open.
+
+    Args:
+        name: Operation name, e.g. "generate_content"
+        **attributes: Initial attributes for the span
+
+    Yields:
+        The Span, or a no-op stand-in when tracing is off
+    """
+    exporter = _exporter
+    if exporter is None:
+        yield _NOOP_SPAN
+        return
+
+    current = Span(name, _current_span.get(), attributes)
+    token = _current_span.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = "ERROR"
+        current.set("error", str(e))
+        raise
+    finally:
+        _current_span.reset(token)
+        current.end()
+        exporter.export(current)
+
+
+def current_span():
+    """Return the span currently open in this context, or a no-op stand-in."""
+    return _current_span.get() or _NOOP_SPAN
+
+
+def record_usage(span, usage_metadata):
+    """Copy token counts from a response's usage_metadata onto a span."""
+    if usage_metadata is None:
+        return
+    for field in ("prompt_token_count", "candidates_token_count", "cached_content_token_count", "total_token_count"):
+        value = getattr(usage_metadata, field, None)
+        if value is not None:
+            span.set(field, value)